@@ -0,0 +1,12 @@
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+app = FastAPI(
+    title="AI Feedback MVP",
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+)
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "version": "0.1.0"}
@@ -0,0 +1,208 @@
+# backend/api/coach_eval.py
+
+import atexit
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["coach_eval"])
+
+# ---------- SQLite 초기화 ----------
+
+DB_PATH = Path("coach_evals.db")
+
+# 커넥션마다 다시 설정해야 하는 PRAGMA 들
+# (journal_mode=WAL 은 DB 파일에 영구 저장되므로 init_db 에서 한 번만 설정)
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",    # WAL 모드에서는 NORMAL 로도 안전, commit 마다 fsync 하지 않음
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",     # 약 64MB 페이지 캐시
+    "PRAGMA mmap_size=268435456",   # 256MB mmap
+    "PRAGMA busy_timeout=5000",     # 쓰기 잠금 대기 최대 5초
+)
+
+
+def _connect() -> sqlite3.Connection:
+    # 여러 threadpool 워커에서 공유하므로 check_same_thread=False
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def init_db() -> sqlite3.Connection:
+    """
+    테이블을 만들고, 프로세스 전체에서 재사용할 커넥션을 돌려준다.
+    (요청마다 connect/close 하면 페이지 캐시가 매번 버려짐)
+    """
+    conn = _connect()
+    # WAL: 동시 /feedback/coach-eval 쓰기 중에도 읽기가 막히지 않도록
+    conn.execute("PRAGMA journal_mode=WAL")
+    c = conn.cursor()
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS coach_report_feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            encounter_id TEXT,
+            scenario_code TEXT,
+            scale_code TEXT,
+            model_version TEXT,
+            helpful_score INTEGER,
+            helpful_flags TEXT,
+            comment TEXT,
+            -- 타임스탬프는 SQLite 가 직접 채움 (UTC, ISO8601)
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        )
+        """
+    )
+    # encounter 별 조회 / 최신순 정렬용 인덱스
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cfb_encounter "
+        "ON coach_report_feedback(encounter_id)"
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cfb_created "
+        "ON coach_report_feedback(created_at)"
+    )
+    conn.commit()
+    return conn
+
+
+def _close_db(conn: sqlite3.Connection) -> None:
+    """프로세스 종료 시: 쿼리 플래너 통계(sqlite_stat1) 갱신 후 커넥션 닫기."""
+    try:
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+
+# 같은 SQL 문자열 객체를 재사용해야 sqlite3 모듈의 statement cache 에 걸림
+# (f-string 등으로 매번 새로 만들지 말 것)
+INSERT_SQL = """
+    INSERT INTO coach_report_feedback (
+        encounter_id,
+        scenario_code,
+        scale_code,
+        model_version,
+        helpful_score,
+        helpful_flags,
+        comment
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_CONN = init_db()
+atexit.register(_close_db, _CONN)
+# SQLite 는 어차피 writer 를 직렬화하므로, 공유 커넥션은 lock 하나로 보호
+_LOCK = threading.Lock()
+
+
+# ---------- Pydantic 모델 ----------
+
+class CoachEvalRequest(BaseModel):
+    """
+    코칭 리포트가 얼마나 도움이 되었는지에 대한 사용자 평가 요청 모델
+    """
+    encounter_id: str = Field(..., description="feedback 세션을 식별하는 ID")
+    scenario_code: Optional[str] = Field(
+        default="EM_DEBRIEF",
+        description="상황 코드 (예: EM_DEBRIEF)"
+    )
+    scale_code: Optional[str] = Field(
+        default="OSAD_DEBRIEFER",
+        description="스케일 코드 (예: OSAD_DEBRIEFER)"
+    )
+    model_version: Optional[str] = Field(
+        default=None,
+        description="코칭 리포트를 생성한 모델/프롬프트 버전"
+    )
+    helpful_score: int = Field(
+        ...,
+        ge=1,
+        le=5,
+        description="코칭 리포트의 도움 정도 (1~5 리커트)"
+    )
+    helpful_flags: Optional[List[str]] = Field(
+        default=None,
+        description="도움이 된 부분 체크박스 (예: ['strengths', 'script_next_time'])"
+    )
+    comment: Optional[str] = Field(
+        default=None,
+        description="추가 코멘트 (선택)"
+    )
+
+
+
+# ---------- 라우터 ----------
+
+def _insert_coach_eval(payload: CoachEvalRequest) -> None:
+    # with _CONN: 성공 시 commit, 예외 시 rollback
+    with _LOCK, _CONN:
+        _CONN.execute(
+            INSERT_SQL,
+            (
+                payload.encounter_id,
+                payload.scenario_code,
+                payload.scale_code,
+                payload.model_version,
+                payload.helpful_score,
+                orjson.dumps(payload.helpful_flags).decode() if payload.helpful_flags else None,
+                payload.comment,
+            ),
+        )
+
+
+# body 를 직접 파싱하므로 OpenAPI 문서용 스키마는 따로 달아 준다
+_COACH_EVAL_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": CoachEvalRequest.model_json_schema()},
+        },
+    },
+}
+
+
+@router.post("/feedback/coach-eval", openapi_extra=_COACH_EVAL_OPENAPI)
+async def save_coach_eval(request: Request) -> ORJSONResponse:
+    """
+    코칭 리포트에 대한 사용자의 평가를 저장한다.
+    추후 모델/프롬프트 개선 및 릴리즈 의사결정에 활용.
+
+    - body 는 model_validate_json 으로 raw bytes 에서 바로 검증한다
+      (json.loads → dict → 검증 의 두 단계를 pydantic-core 한 번으로)
+    - sqlite3 호출은 blocking 이므로 threadpool 에서 실행 (이벤트 루프를 막지 않음)
+    """
+    try:
+        payload = CoachEvalRequest.model_validate_json(await request.body())
+    except ValidationError as ve:
+        # FastAPI 기본 body 검증과 같은 422 응답 형식 유지 (loc 앞에 "body")
+        raise RequestValidationError(
+            [
+                {**err, "loc": ("body", *err["loc"])}
+                for err in ve.errors(include_url=False)
+            ]
+        )
+
+    try:
+        await run_in_threadpool(_insert_coach_eval, payload)
+
+        # response_model 재검증 / jsonable_encoder 를 거치지 않고 바로 응답
+        return ORJSONResponse({"status": "ok"})
+
+    except Exception as e:
+        logger.exception("/feedback/coach-eval save failed")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to save coach evaluation: {e}",
+        )
@@ -1,17 +1,21 @@
 # backend/api/db_admin.py
 
+import logging
+import time
 from typing import Dict, Any, List
-from datetime import datetime
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import inspect, select
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import insert, inspect, select
 from sqlalchemy.orm import Session
 
-from backend.db import engine, get_db, SessionLocal
+from backend.db import engine, get_db
 from backend.models.feedback_models import CoachEval, CoachMemo
 from backend.models.health_check import DbHealthCheck
 from backend.models import Scenario, Scale, ScaleItem  # ★ 새로 추가된 모델들
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/db", tags=["db-admin"])
 
 
@@ -19,7 +23,7 @@ router = APIRouter(prefix="/db", tags=["db-admin"])
 # 1. DB 연결 정보
 # ======================================================
 @router.get("/info")
-def db_info() -> Dict[str, Any]:
+def db_info() -> ORJSONResponse:
     """
     DB 연결 정보 및 엔진 상태 확인
     (기존 기능 유지)
@@ -28,37 +32,54 @@ def db_info() -> Dict[str, Any]:
     dialect = engine.url.get_dialect().name
     driver = engine.url.get_driver_name()
 
-    return {
+    return ORJSONResponse({
         "database_url": url,
         "dialect": dialect,
         "driver": driver,
         "status": "connected-ok",
-    }
+    })
 
 
 # ======================================================
 # 2. 테이블 목록 조회
 # ======================================================
+# 테이블 목록은 런타임에 거의 바뀌지 않으므로
+# 매 요청마다 sqlite_master / pg_catalog 를 조회하지 않고 잠시 캐시한다.
+# (런타임에 DDL 을 실행하게 되면 _table_names_cache["tables"] = None 으로 비울 것)
+TABLE_NAMES_TTL_SEC = 60.0
+_table_names_cache: Dict[str, Any] = {"fetched_at": 0.0, "tables": None}
+
+
+def _cached_table_names() -> List[str]:
+    now = time.monotonic()
+    if (
+        _table_names_cache["tables"] is None
+        or now - _table_names_cache["fetched_at"] > TABLE_NAMES_TTL_SEC
+    ):
+        _table_names_cache["tables"] = inspect(engine).get_table_names()
+        _table_names_cache["fetched_at"] = now
+    return _table_names_cache["tables"]
+
+
 @router.get("/tables")
-def db_tables() -> Dict[str, Any]:
+def db_tables() -> ORJSONResponse:
     """
     현재 DB에 생성된 테이블 목록 확인
     (기존 기능 유지)
     """
-    insp = inspect(engine)
-    tables = insp.get_table_names()
+    tables = _cached_table_names()
 
-    return {
+    return ORJSONResponse({
         "tables": tables,
         "count": len(tables),
-    }
+    })
 
 
 # ======================================================
 # 3. 주요 테이블 샘플 조회
 # ======================================================
 @router.get("/sample")
-def db_sample(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def db_sample(db: Session = Depends(get_db)) -> ORJSONResponse:
     """
     주요 테이블 데이터 TOP 5 샘플 조회
     (기존 기능 유지)
@@ -69,187 +90,210 @@ def db_sample(db: Session = Depends(get_db)) -> Dict[str, Any]:
         "db_health_check": [],
     }
 
+    # ORM 객체 대신 필요한 컬럼만 tuple 로 조회
+    # (identity map 등록 / attribute instrumentation 생략)
+
     # CoachEval
-    rows = db.query(CoachEval).limit(5).all()
-    result["coach_eval"] = [
-        {
-            "id": r.id,
-            "encounter_id": r.encounter_id,
-            "scenario_code": r.scenario_code,
-            "scale_code": r.scale_code,
-            "model_version": r.model_version,
-            "helpful_score": r.helpful_score,
-            "helpful_flags": r.helpful_flags,
-            "created_at": r.created_at,
-        }
-        for r in rows
-    ]
+    rows = db.execute(
+        select(
+            CoachEval.id,
+            CoachEval.encounter_id,
+            CoachEval.scenario_code,
+            CoachEval.scale_code,
+            CoachEval.model_version,
+            CoachEval.helpful_score,
+            CoachEval.helpful_flags,
+            CoachEval.created_at,
+        ).limit(5)
+    ).all()
+    result["coach_eval"] = [dict(r._mapping) for r in rows]
 
     # CoachMemo
-    rows = db.query(CoachMemo).limit(5).all()
-    result["coach_memo"] = [
-        {
-            "id": r.id,
-            "encounter_id": r.encounter_id,
-            "scenario_code": r.scenario_code,
-            "scale_code": r.scale_code,
-            "model_version": r.model_version,
-            "saved_sections": r.saved_sections,
-            "created_at": r.created_at,
-        }
-        for r in rows
-    ]
-
-    # DbHealthCheck
-    rows = db.query(DbHealthCheck).limit(5).all()
-    result["db_health_check"] = [
-        {
-            "id": r.id,
-            "message": r.message,
-            "created_at": r.created_at,
-        }
-        for r in rows
-    ]
-
-    return result
+    rows = db.execute(
+        select(
+            CoachMemo.id,
+            CoachMemo.encounter_id,
+            CoachMemo.scenario_code,
+            CoachMemo.scale_code,
+            CoachMemo.model_version,
+            CoachMemo.saved_sections,
+            CoachMemo.created_at,
+        ).limit(5)
+    ).all()
+    result["coach_memo"] = [dict(r._mapping) for r in rows]
+
+    # DbHealthCheck (모델에는 message 컬럼이 없고 name 컬럼을 사용)
+    rows = db.execute(
+        select(
+            DbHealthCheck.id,
+            DbHealthCheck.name.label("message"),
+            DbHealthCheck.created_at,
+        ).limit(5)
+    ).all()
+    result["db_health_check"] = [dict(r._mapping) for r in rows]
+
+    # created_at(datetime) 도 orjson 이 직접 ISO 문자열로 직렬화
+    return ORJSONResponse(result)
 
 
 # ======================================================
 # 4. 스케일/시나리오 SEED를 위한 helper 함수들
 # ======================================================
+def _upsert_code_returning_id(db: Session, model, values: Dict[str, Any]) -> int:
+    """
+    code(unique) 기준 get-or-create 를 INSERT 한 문장으로 처리하고 id 를 돌려준다.
+    - 이미 있으면 ON CONFLICT(code) DO UPDATE SET code=code 로 기존 row 의 id 를 RETURNING
+      (기존 row 의 다른 컬럼은 건드리지 않음: 기존 get-or-create 동작 유지)
+    - SELECT → INSERT 사이의 경합도 없고, ORM flush 도 필요 없다.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        # ON CONFLICT 미지원 DB: SELECT 후 없으면 INSERT ... RETURNING
+        existing_id = db.execute(
+            select(model.id).where(model.code == values["code"])
+        ).scalar_one_or_none()
+        if existing_id is not None:
+            return existing_id
+        return db.execute(
+            insert(model).values(**values).returning(model.id)
+        ).scalar_one()
+
+    stmt = dialect_insert(model.__table__).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[model.__table__.c.code],
+        set_={"code": stmt.excluded.code},
+    ).returning(model.__table__.c.id)
+    return db.execute(stmt).scalar_one()
+
+
 def _get_or_create_scenario(
     db: Session,
     code: str,
     name: str,
     description: str | None = None,
-) -> Scenario:
+) -> int:
     """
-    Scenario(code=...) 가 있으면 그대로 반환,
-    없으면 새로 만들고 flush 까지 수행.
-    created_at NOT NULL 문제를 피하기 위해
-    created_at 을 명시적으로 채워 넣는다.
+    Scenario(code=...) 가 있으면 그 id 를,
+    없으면 새로 만들고 그 id 를 반환.
+    created_at / updated_at 은 모델의 default=func.now() 로 INSERT 문 안에서 DB 가 채운다
+    (DEFAULT 가 없는 기존 배포 테이블에서도 NOT NULL 충족).
     """
-    obj = db.execute(
-        select(Scenario).where(Scenario.code == code)
-    ).scalar_one_or_none()
-    if obj:
-        return obj
-
-    obj = Scenario(
-        code=code,
-        name=name,
-        description=description,
-        is_active=True,
-        created_at=datetime.utcnow(),  # ★ NOT NULL 직접 채워주기
+    return _upsert_code_returning_id(
+        db,
+        Scenario,
+        {
+            "code": code,
+            "name": name,
+            "description": description,
+            "is_active": True,
+        },
     )
-    db.add(obj)
-    db.flush()
-    return obj
 
 
 def _get_or_create_scale(
     db: Session,
     code: str,
     name: str,
-    scenario: Scenario,
+    scenario_id: int,
     description: str | None,
     max_item_score: int,
     num_items: int,
     max_total: int,
     version: str | None = None,
-) -> Scale:
+) -> int:
     """
-    Scale(code=...) 이 있으면 그대로 반환,
-    없으면 새로 만들고 flush 까지 수행.
-    created_at NOT NULL 문제를 피하기 위해
-    created_at 을 명시적으로 채워 넣는다.
+    Scale(code=...) 이 있으면 그 id 를,
+    없으면 새로 만들고 그 id 를 반환.
+    created_at / updated_at 은 모델의 default=func.now() 로 INSERT 문 안에서 DB 가 채운다
+    (DEFAULT 가 없는 기존 배포 테이블에서도 NOT NULL 충족).
     """
-    obj = db.execute(
-        select(Scale).where(Scale.code == code)
-    ).scalar_one_or_none()
-    if obj:
-        return obj
-
-    obj = Scale(
-        code=code,
-        name=name,
-        description=description,
-        scenario_id=scenario.id,
-        max_item_score=max_item_score,
-        num_items=num_items,
-        max_total=max_total,
-        version=version,
-        is_active=True,
-        created_at=datetime.utcnow(),  # ★ 안전하게 채워주기
+    return _upsert_code_returning_id(
+        db,
+        Scale,
+        {
+            "code": code,
+            "name": name,
+            "description": description,
+            "scenario_id": scenario_id,
+            "max_item_score": max_item_score,
+            "num_items": num_items,
+            "max_total": max_total,
+            "version": version,
+            "is_active": True,
+        },
     )
-    db.add(obj)
-    db.flush()
-    return obj
 
 
 def _create_scale_items_if_empty(
     db: Session,
-    scale: Scale,
+    scale_id: int,
     items: List[Dict[str, Any]],
 ) -> int:
     """
     해당 scale에 이미 item이 있으면 아무 것도 만들지 않고 0 리턴.
     없으면 주어진 items 리스트를 생성하고 생성 개수를 리턴.
-    created_at NOT NULL 문제를 피하기 위해 created_at 을 채워준다.
+    created_at / updated_at 은 모델의 default=func.now() 로 INSERT 문 안에서 DB 가 채운다
+    (DEFAULT 가 없는 기존 배포 테이블에서도 NOT NULL 충족).
     """
+    # row 하나만 있는지 확인 (ORM 객체로 로드하지 않음)
     existing = db.execute(
-        select(ScaleItem).where(ScaleItem.scale_id == scale.id)
-    ).scalars().all()
+        select(1).where(ScaleItem.scale_id == scale_id).limit(1)
+    ).first()
 
     if existing:
         return 0
 
-    count = 0
-    for idx, item in enumerate(items, start=1):
-        obj = ScaleItem(
-            scale_id=scale.id,
-            item_code=item["item_code"],
-            order_index=item.get("order_index", idx),
-            title_ko=item["title_ko"],
-            title_en=item["title_en"],
-            description_ko=item.get("description_ko"),
-            description_en=item.get("description_en"),
-            is_active=True,
-            created_at=datetime.utcnow(),  # ★ 여기도
-        )
-        db.add(obj)
-        count += 1
+    rows = [
+        {
+            "scale_id": scale_id,
+            "item_code": item["item_code"],
+            "order_index": item.get("order_index", idx),
+            "title_ko": item["title_ko"],
+            "title_en": item["title_en"],
+            "description_ko": item.get("description_ko"),
+            "description_en": item.get("description_en"),
+            "is_active": True,
+        }
+        for idx, item in enumerate(items, start=1)
+    ]
+    if rows:
+        # 문항별 INSERT N번 대신 Core executemany 한 번
+        # (SQLAlchemy 2.0 은 insertmanyvalues 로 multi-VALUES INSERT 를 만든다)
+        db.execute(insert(ScaleItem.__table__), rows)
 
-    return count
+    return len(rows)
 
 
 # ======================================================
 # 5. OSAD / OMP 기본 스케일 SEED 엔드포인트
 # ======================================================
 @router.api_route("/seed-scales", methods=["GET", "POST"])
-def seed_scales() -> Dict[str, Any]:
+def seed_scales(db: Session = Depends(get_db)) -> ORJSONResponse:
     """
     OSAD_DEBRIEFER, OMP_CLINICAL 스케일과 문항들을 기본값으로 삽입한다.
     여러 번 호출해도 중복 생성되지 않도록 설계함.
     GET / POST 둘 다 허용 (브라우저 주소창에서도 바로 호출 가능).
+    세션은 다른 엔드포인트와 같이 get_db 의존성으로 받는다 (close 는 get_db 가 처리).
     """
-    db = SessionLocal()
-
     try:
         # ---------- 1) OSAD: 시뮬레이션 디브리핑 ----------
-        osad_scenario = _get_or_create_scenario(
+        osad_scenario_id = _get_or_create_scenario(
             db,
             code="EM_DEBRIEF",
             name="응급의학 시뮬레이션 디브리핑 (Emergency Medicine Debriefing)",
             description="시뮬레이션 후 디브리핑 상황에서 사용하는 피드백 스케일.",
         )
 
-        osad_scale = _get_or_create_scale(
+        osad_scale_id = _get_or_create_scale(
             db,
             code="OSAD_DEBRIEFER",
             name="OSAD 스케일 (OSAD for Debriefer)",
             description="Objective Structured Assessment of Debriefing, 지도전문의/디브리퍼용 스케일.",
-            scenario=osad_scenario,
+            scenario_id=osad_scenario_id,
             max_item_score=5,
             num_items=9,
             max_total=45,
@@ -304,22 +348,22 @@ def seed_scales() -> Dict[str, Any]:
             },
         ]
 
-        created_osad_items = _create_scale_items_if_empty(db, osad_scale, osad_items)
+        created_osad_items = _create_scale_items_if_empty(db, osad_scale_id, osad_items)
 
         # ---------- 2) OMP: 임상 진료 후 피드백 ----------
-        omp_scenario = _get_or_create_scenario(
+        omp_scenario_id = _get_or_create_scenario(
             db,
             code="CLINICAL_OMP",
             name="임상 진료 후 일상 피드백 (Clinical teaching with OMP)",
             description="환자를 진료한 전공의에게 일상적으로 제공하는 피드백 상황.",
         )
 
-        omp_scale = _get_or_create_scale(
+        omp_scale_id = _get_or_create_scale(
             db,
             code="OMP_CLINICAL",
             name="원 미닛 프리셉터 (One-Minute Preceptor)",
             description="One-Minute Preceptor 원형 스케일. 임상 진료 후 전공의 지도에 사용.",
-            scenario=omp_scenario,
+            scenario_id=omp_scenario_id,
             max_item_score=5,
             num_items=5,
             max_total=25,
@@ -355,32 +399,30 @@ def seed_scales() -> Dict[str, Any]:
             },
         ]
 
-        created_omp_items = _create_scale_items_if_empty(db, omp_scale, omp_items)
+        created_omp_items = _create_scale_items_if_empty(db, omp_scale_id, omp_items)
 
         db.commit()
 
-        return {
+        return ORJSONResponse({
             "status": "ok",
             "message": "OSAD / OMP 기본 스케일 seed 완료",
             "details": {
                 "osad": {
-                    "scenario_code": osad_scenario.code,
-                    "scale_code": osad_scale.code,
+                    "scenario_code": "EM_DEBRIEF",
+                    "scale_code": "OSAD_DEBRIEFER",
                     "items_created": created_osad_items,
                 },
                 "omp": {
-                    "scenario_code": omp_scenario.code,
-                    "scale_code": omp_scale.code,
+                    "scenario_code": "CLINICAL_OMP",
+                    "scale_code": "OMP_CLINICAL",
                     "items_created": created_omp_items,
                 },
             },
-        }
+        })
     except Exception as e:
         db.rollback()
-        print("=== DEBUG: /db/seed-scales ERROR ===", repr(e))
-        return {
+        logger.exception("/db/seed-scales failed")
+        return ORJSONResponse({
             "status": "error",
             "error": str(e),
-        }
-    finally:
-        db.close()
+        })
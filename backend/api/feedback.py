@@ -1,14 +1,22 @@
 # backend/api/feedback.py
 
-import json
-from typing import List, Optional, Dict, Any
-
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple, Type, TypeVar
+
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing_extensions import NotRequired, TypedDict
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 # STT에서 이미 만든 OpenAI client 재사용
-from backend.api.stt import client as openai_client
+from backend.api.stt import async_client as openai_async_client
 
 # DB 관련
 from backend.db import get_db
@@ -25,7 +33,8 @@ SCALE_CONFIG: Dict[str, Dict[str, Any]] = {
         "max_per_item": 5,
         "num_items": 9,
         "max_total": 45,  # 9개 항목 × 5점 = 45
-        "dimensions": [
+        # dimensions 는 요청마다 순회만 하므로 불변 tuple 로 둔다
+        "dimensions": (
             "approach",
             "learning_env",
             "engagement",
@@ -35,9 +44,82 @@ SCALE_CONFIG: Dict[str, Dict[str, Any]] = {
             "diagnosis",
             "application",
             "summary",
-        ],
-        # 필요하면 나중에 OSAD 항목 설명도 여기에 추가 가능
-        # "dimension_labels": { ... }
+        ),
+        # 🔹 각 항목 제목: 한글 + (영어 원문) 병기 (db_admin seed 의 title_ko 와 동일)
+        "dimension_labels": {
+            "approach": "접근과 분위기 설정 (Approach and environment)",
+            "learning_env": "학습 환경 조성 (Establishing learning environment)",
+            "engagement": "참여와 의사소통 (Engagement and communication)",
+            "reaction": "반응 다루기 (Exploring reactions)",
+            "reflection": "성찰 유도 (Encouraging reflection)",
+            "analysis": "분석과 의미 부여 (Analysis and meaning making)",
+            "diagnosis": "진단과 근거 토론 (Diagnosis and reasoning)",
+            "application": "임상 적용 논의 (Application to future practice)",
+            "summary": "요약과 마무리 (Summary and closure)",
+        },
+        # 🔹 채점 기준점 (1점 / 3점 / 5점 행동 묘사, OSAD 원문 기준) → system 프롬프트에 들어감
+        "dimension_anchors": {
+            "approach": (
+                "Confrontational or judgmental approach; the trainee is put on the defensive.",
+                "Attempts to build rapport with the trainee but is either overcritical or too informal.",
+                "Establishes and keeps rapport throughout; uses a non-threatening but honest approach "
+                "that makes the conversation psychologically safe.",
+            ),
+            "learning_env": (
+                "No explanation of the purpose of the debriefing; expectations of the trainee are unclear.",
+                "Explains the purpose or learning objectives of the debriefing, "
+                "but does not clarify what is expected from the trainee.",
+                "At the start, explains the purpose of the debriefing and clarifies "
+                "objectives and expectations (e.g. confidentiality, how the session will run).",
+            ),
+            "engagement": (
+                "Purely didactic; the supervisor does almost all of the talking and the trainee stays passive.",
+                "The trainee takes part, but mostly through closed questions; "
+                "the supervisor does not actively invite further contribution.",
+                "Fully engages the trainee with open questions, listens, and actively invites "
+                "the trainee to talk through their own thinking.",
+            ),
+            "reaction": (
+                "No acknowledgement of the trainee's reactions or of the emotional impact of the case.",
+                "Asks how the trainee feels, but does not explore the reaction further.",
+                "Fully explores the trainee's reaction to the event and deals appropriately "
+                "with distress, frustration or defensiveness before moving on.",
+            ),
+            "reflection": (
+                "No opportunity for the trainee to reflect on what happened.",
+                "Some reflection by the trainee, but the supervisor does not help them "
+                "describe the sequence of events.",
+                "Encourages the trainee to reflect on what happened, step by step, in their own words "
+                "before the supervisor adds their own view.",
+            ),
+            "analysis": (
+                "Reasons for and consequences of the trainee's actions are not explored.",
+                "Some exploration of reasons and consequences, with little attempt to relate them "
+                "to a wider context or to previous experience.",
+                "Helps the trainee explore why actions were taken and what they led to, using specific "
+                "examples and relating them to previous experience and general principles.",
+            ),
+            "diagnosis": (
+                "No feedback on clinical reasoning or on behavioural (teamwork, communication) performance.",
+                "Feedback only on clinical/technical issues, or only general comments; "
+                "performance gaps are not clearly identified.",
+                "Gives specific, objective feedback on both clinical and behavioural performance: "
+                "reinforces good behaviour and names the performance gap and its cause.",
+            ),
+            "application": (
+                "No discussion of how to improve or of what to do differently in future practice.",
+                "Some discussion of learning points, but without concrete strategies for the future.",
+                "Agrees on concrete strategies the trainee can apply next time and links them "
+                "to real clinical practice.",
+            ),
+            "summary": (
+                "The conversation ends abruptly with no summary of key points.",
+                "The supervisor summarises some points, but the trainee is not involved "
+                "and understanding is not checked.",
+                "Key take-home messages are summarised (ideally by the trainee), understanding is checked, "
+                "and the session has a clear closure.",
+            ),
+        },
     },
 
     # 2) OMP 임상 피드백 스케일 (원형 5 microskills)
@@ -48,13 +130,13 @@ SCALE_CONFIG: Dict[str, Dict[str, Any]] = {
         "num_items": 5,
         "max_total": 25,  # 5개 항목 × 5점 = 25
         # JSON 안에서 사용할 키 이름들
-        "dimensions": [
+        "dimensions": (
             "get_commitment",
             "probe_for_evidence",
             "teach_general_rules",
             "reinforce_what_was_done_right",
             "correct_mistakes",
-        ],
+        ),
         # 🔹 각 항목 제목: 한글 + (영어 원문) 병기
         "dimension_labels": {
             "get_commitment": "의견·진단·계획에 대한 전공의 입장 끌어내기 (Get a commitment)",
@@ -63,23 +145,415 @@ SCALE_CONFIG: Dict[str, Dict[str, Any]] = {
             "reinforce_what_was_done_right": "잘한 부분을 구체적으로 강화하기 (Reinforce what was done right)",
             "correct_mistakes": "실수나 부족한 부분을 바로잡아 주기 (Correct mistakes)",
         },
+        # 🔹 채점 기준점 (1점 / 3점 / 5점 행동 묘사)
+        "dimension_anchors": {
+            "get_commitment": (
+                "The supervisor gives the diagnosis or plan without ever asking for the trainee's own view.",
+                "Asks what the trainee thinks, but accepts a vague answer or quickly answers for them.",
+                "Asks the trainee to commit to a specific diagnosis, differential or plan "
+                "(\"What do you think is going on? What would you do?\") and waits for a clear answer.",
+            ),
+            "probe_for_evidence": (
+                "The trainee's reasoning is never explored; the supervisor moves straight to correcting or teaching.",
+                "Asks one quick \"why?\" but does not explore alternatives or the data behind the decision.",
+                "Explores the evidence and thought process behind the commitment, including alternatives "
+                "considered (\"What led you to that? What else did you consider?\"), without judging too early.",
+            ),
+            "teach_general_rules": (
+                "No teaching, or only case-specific facts that cannot be applied to other patients.",
+                "Gives a take-home point, but it is too long, too general, or not tied to the trainee's need.",
+                "Teaches one or two concise, generalisable rules that target the gap shown by this case "
+                "(\"In patients like this, always ...\").",
+            ),
+            "reinforce_what_was_done_right": (
+                "No positive feedback, or only generic praise (\"good job\").",
+                "Mentions what went well, but not specifically enough for the trainee to repeat it.",
+                "Names specific behaviours that were done well and explains why they mattered, "
+                "so the trainee knows what to keep doing.",
+            ),
+            "correct_mistakes": (
+                "Mistakes are ignored, or corrected in a harsh, judgmental way.",
+                "Points out a mistake, but without explaining why it matters or what to do instead.",
+                "Corrects mistakes promptly and privately, explains the consequence, and gives a clear "
+                "alternative; ideally the trainee first reflects on what they would change.",
+            ),
+        },
     },
 }
 
 
+# ---------- 출력 언어 설정 ----------
+
+LANG_NAME_MAP: Dict[str, str] = {
+    "ko": "Korean",
+    "en": "English",
+    "zh": "Chinese",
+    "es": "Spanish",
+    "ja": "Japanese",
+    "fr": "French",
+    "de": "German",
+    "auto": "auto",
+}
+
+
+def _build_lang_instruction(lang_code: str) -> str:
+    if lang_code == "auto":
+        return (
+            "Infer the primary language used by the supervisor in the conversation "
+            "(especially from the 'Supervisor-only speech' section). "
+            "Write all explanation texts (strings) in that language. "
+            "If you cannot clearly infer the language, default to Korean."
+        )
+    output_lang_name = LANG_NAME_MAP.get(
+        lang_code, "the same language as the conversation"
+    )
+    return f"Write all explanation texts (strings) in {output_lang_name}."
+
+
+# lang_code -> 출력 언어 지시문 (user 프롬프트에 들어감)
+LANG_INSTRUCTIONS: Dict[str, str] = {
+    lang_code: _build_lang_instruction(lang_code) for lang_code in LANG_NAME_MAP
+}
+
+
+# ---------- system 프롬프트 ----------
+
+# 스케일 공통 채점/작성 규칙 (system 프롬프트 고정 부분)
+SCORING_RUBRIC = (
+    "How to score each dimension (integer 1-5):\n"
+    "- 1 = not done at all, or done in a way that harms learning.\n"
+    "- 2 = attempted briefly or superficially; most of the behaviour is missing.\n"
+    "- 3 = partially done; matches the score-3 anchor of the dimension.\n"
+    "- 4 = done well, with only minor omissions compared with the score-5 anchor.\n"
+    "- 5 = done fully and consistently; matches the score-5 anchor of the dimension.\n"
+    "Use the anchors below as reference points and choose the closest score. "
+    "Score only what is observable in the transcript: do not assume that a behaviour happened "
+    "if there is no utterance showing it. A dimension with no related utterance at all scores 1. "
+    "Judge each dimension independently, and do not raise or lower every score "
+    "because of a single strong or weak moment.\n\n"
+    "How to fill the other fields:\n"
+    "- structure.has_opening: true if the supervisor opens the conversation by setting its purpose, "
+    "asking how the trainee is, or inviting the trainee's first impressions.\n"
+    "- structure.has_core: true if there is a substantive discussion of the trainee's performance "
+    "(reasoning, actions, or behaviours), not just small talk or logistics.\n"
+    "- structure.has_closing: true if the conversation ends with a summary, agreed next steps, "
+    "or an explicit check of what the trainee will take away.\n"
+    "- coach.strengths: two to four specific things the supervisor did well, each tied to an observed "
+    "utterance (paraphrase or short quote), written as feedback to the supervisor.\n"
+    "- coach.improvements_top3: at most three improvements, most important first; each must be concrete "
+    "and actionable (what to say or do differently), and should target the lowest-scoring dimensions.\n"
+    "- coach.script_next_time: a short example script (two to four sentences) the supervisor could say "
+    "in a similar conversation next time, addressing the top improvement.\n"
+    "- coach.micro_habit_10sec: one tiny habit the supervisor can practise in about ten seconds "
+    "in every feedback conversation (e.g. asking one open question before giving an opinion).\n"
+    "Write coaching for the supervisor (the one giving feedback), not for the trainee, "
+    "and keep the tone respectful, specific and encouraging.\n"
+)
+
+
+def _build_system_prompt(scale_code: str) -> str:
+    """
+    system 프롬프트는 scale_code 에만 의존하므로
+    아래 SYSTEM_PROMPTS 에서 import 시점에 한 번만 만든다.
+
+    OpenAI prompt caching 은 요청 간 '앞부분(prefix)'이 완전히 같을 때만 적용되므로,
+    언어 지시문 / 스케일 코드 안내처럼 요청마다 달라질 수 있는 값은
+    여기 넣지 않고 user 프롬프트로 보낸다.
+    """
+    scale_cfg = SCALE_CONFIG[scale_code]
+    dimensions: Tuple[str, ...] = scale_cfg["dimensions"]
+    dimension_labels: Dict[str, str] = scale_cfg.get("dimension_labels", {})
+    dimension_anchors: Dict[str, Tuple[str, str, str]] = scale_cfg.get("dimension_anchors", {})
+
+    # ---------- JSON 스키마(점수 / evidence) 문자열 생성 ----------
+    # 점수 부분: "osad": { "<dim>": int(1-5), ... }
+    score_schema_lines: List[str] = []
+    for dim in dimensions:
+        score_schema_lines.append(f'    "{dim}": int (1-5),\n')
+    score_schema_text = "".join(score_schema_lines)
+
+    # evidence 부분: "evidence": { "osad": { "<dim>": [int, ...], ... } }
+    ev_schema_lines: List[str] = []
+    for dim in dimensions:
+        ev_schema_lines.append(f'      "{dim}": [int, ...],\n')
+    evidence_schema_text = "".join(ev_schema_lines)
+
+    # 프롬프트에 보여줄 스케일 항목 설명 + 1/3/5점 기준점 (있으면)
+    dimension_desc_text = ""
+    if dimension_labels:
+        desc_lines = []
+        for dim in dimensions:
+            label = dimension_labels.get(dim, dim)
+            desc_lines.append(f"- {dim}: {label}")
+            anchors = dimension_anchors.get(dim)
+            if anchors:
+                for score, anchor in zip((1, 3, 5), anchors):
+                    desc_lines.append(f"    score {score}: {anchor}")
+        dimension_desc_text = "\n".join(desc_lines)
+
+    system_prompt = (
+        "You are an expert in medical education and feedback.\n"
+        "You analyze a debriefing/feedback conversation between a supervisor "
+        "and a trainee (resident), then score it and provide coaching tips.\n\n"
+    )
+
+    system_prompt += SCORING_RUBRIC + "\n"
+
+    if dimension_desc_text:
+        system_prompt += "This scale has the following dimensions (with score anchors):\n"
+        system_prompt += dimension_desc_text + "\n\n"
+
+    system_prompt += (
+        "You MUST reply in a single valid JSON object ONLY, with this schema:\n"
+        "{\n"
+        '  "osad": {\n'
+        f"{score_schema_text}"
+        "  },\n"
+        '  "structure": {\n'
+        '    "has_opening": bool,\n'
+        '    "has_core": bool,\n'
+        '    "has_closing": bool\n'
+        "  },\n"
+        '  "coach": {\n'
+        '    "strengths": [string, ...],\n'
+        '    "improvements_top3": [string, ...],\n'
+        '    "script_next_time": string,\n'
+        '    "micro_habit_10sec": string\n'
+        "  },\n"
+        '  "evidence": {\n'
+        '    "osad": {\n'
+        f"{evidence_schema_text}"
+        "    }\n"
+        "  }\n"
+        "}\n\n"
+        "All evidence indices must refer to the segment indices given in the input.\n"
+        "Use only indices that exist. If there is no clear evidence, use an empty list.\n"
+        "Follow the output-language instruction given in the user message.\n"
+        "If only the supervisor's speech is provided separately, "
+        "focus your scoring and coaching mainly on the supervisor's feedback behaviour.\n"
+    )
+
+    return system_prompt
+
+
+# scale_code -> 완성된 system 프롬프트 (언어와 무관하게 동일 → 캐시 prefix 공유)
+SYSTEM_PROMPTS: Dict[str, str] = {
+    scale_code: _build_system_prompt(scale_code) for scale_code in SCALE_CONFIG
+}
+
+
+# ---------- user 프롬프트 ----------
+
+# speaker_mapping 에서 '지도전문의 발언'으로 모을 역할 이름 (프론트와 동일한 값)
+SUPERVISOR_ROLE = "지도전문의"
+
+
+# scale_code -> user 프롬프트 첫 줄 (스케일 안내)
+SCALE_BANNERS: Dict[str, str] = {
+    scale_code: (
+        f"You are now using a feedback scale with code: {scale_code}, "
+        f"label: {scale_cfg['label']}."
+    )
+    for scale_code, scale_cfg in SCALE_CONFIG.items()
+}
+
+
+def _build_user_prompt(
+    *,
+    scale_code: str,
+    lang_instruction: str,
+    language: str,
+    trainee_level: Optional[str],
+    scenario_code: Optional[str],
+    context_desc: str,
+    transcript: str,
+    segments_desc: str,
+    supervisor_only_text: str,
+) -> str:
+    """
+    요청마다 달라지는 값은 모두 user 프롬프트로 (system 프롬프트는 스케일별 고정).
+    list append + join 대신 f-string 하나로 한 번에 만든다.
+    """
+    supervisor_block = ""
+    if supervisor_only_text:
+        supervisor_block = (
+            "\n\nSupervisor-only speech (extracted from segments based on speaker_mapping):\n"
+            "------------------------------------\n"
+            f"{supervisor_only_text}\n"
+            "\n"
+            "When scoring and generating coaching tips, "
+            "prioritize the supervisor-only speech above."
+        )
+
+    return (
+        f"{SCALE_BANNERS[scale_code]}\n"
+        f"Output language: {lang_instruction}\n"
+        "\n"
+        f"Language code from client: {language}\n"
+        f"Trainee level: {trainee_level}\n"
+        f"Scenario code: {scenario_code}\n"
+        f"Scale code: {scale_code}\n"
+        f"Context: {context_desc}\n"
+        "\n"
+        "Full conversation transcript:\n"
+        "------------------------------------\n"
+        f"{transcript}\n"
+        "\n"
+        "Segments with indices:\n"
+        "------------------------------------\n"
+        f"{segments_desc}"
+        f"{supervisor_block}"
+        "\n\nNow analyze this feedback conversation using the specified scale "
+        "and respond ONLY with a JSON object following the required schema."
+    )
+
+
+# ---------- Structured Outputs 용 JSON Schema ----------
+
+def _build_response_format(scale_code: str) -> Dict[str, Any]:
+    """
+    OpenAI Structured Outputs(strict) 용 response_format.
+    모델이 스키마를 반드시 지키므로 서버에서 키 누락을 보정할 필요가 없다.
+    total / scale / percent 는 모델에게 받지 않고 서버에서 항목 점수로 계산한다.
+    (strict 모드: 모든 property required + additionalProperties=false 필요)
+    """
+    dimensions: Tuple[str, ...] = SCALE_CONFIG[scale_code]["dimensions"]
+
+    def obj(properties: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties),
+            "additionalProperties": False,
+        }
+
+    score = {"type": "integer", "enum": [1, 2, 3, 4, 5]}
+    str_list = {"type": "array", "items": {"type": "string"}}
+    index_list = {"type": "array", "items": {"type": "integer"}}
+
+    schema = obj({
+        "osad": obj({dim: score for dim in dimensions}),
+        "structure": obj({
+            "has_opening": {"type": "boolean"},
+            "has_core": {"type": "boolean"},
+            "has_closing": {"type": "boolean"},
+        }),
+        "coach": obj({
+            "strengths": str_list,
+            "improvements_top3": str_list,
+            "script_next_time": {"type": "string"},
+            "micro_habit_10sec": {"type": "string"},
+        }),
+        "evidence": obj({
+            "osad": obj({dim: index_list for dim in dimensions}),
+        }),
+    })
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": f"{scale_code.lower()}_feedback",
+            "schema": schema,
+            "strict": True,
+        },
+    }
+
+
+# scale_code -> response_format
+RESPONSE_FORMATS: Dict[str, Dict[str, Any]] = {
+    scale_code: _build_response_format(scale_code) for scale_code in SCALE_CONFIG
+}
+
+
+# ---------- 입력이 너무 짧을 때의 기본 응답 ----------
+
+# transcript 가 이보다 짧으면 LLM 을 호출하지 않고 아래 skeleton 을 바로 돌려준다.
+MIN_TRANSCRIPT_CHARS = 50
+
+
+def _build_empty_feedback(scale_code: str) -> Dict[str, Any]:
+    """
+    분석할 내용이 없을 때 쓰는 응답. /feedback 정상 응답과 같은 구조로,
+    모든 항목 최저점(1점) + 빈 coach/evidence 로 채운다.
+    """
+    scale_cfg = SCALE_CONFIG[scale_code]
+    dimensions: Tuple[str, ...] = scale_cfg["dimensions"]
+    max_total = scale_cfg["max_total"]
+    total = len(dimensions)
+
+    osad: Dict[str, Any] = {dim: 1 for dim in dimensions}
+    osad["total"] = total
+    osad["scale"] = max_total
+    osad["percent"] = round(total / max_total * 100, 1) if max_total > 0 else 0.0
+
+    return {
+        "osad": osad,
+        "structure": {
+            "has_opening": False,
+            "has_core": False,
+            "has_closing": False,
+        },
+        "coach": {
+            "strengths": [],
+            "improvements_top3": [],
+            "script_next_time": "",
+            "micro_habit_10sec": "",
+        },
+        "evidence": {"osad": {dim: [] for dim in dimensions}},
+        # LLM 분석 결과가 아니라 서버가 만든 기본 응답임을 표시
+        "note": "insufficient_input",
+    }
+
+
+# scale_code -> 빈 입력용 응답
+# (바로 ORJSONResponse 로 직렬화만 하고 수정하지 않으므로 요청마다 복사할 필요 없음)
+EMPTY_FEEDBACK: Dict[str, Dict[str, Any]] = {
+    scale_code: _build_empty_feedback(scale_code) for scale_code in SCALE_CONFIG
+}
+
+
+# ---------- /feedback 응답 캐시 ----------
+
+# 같은 프롬프트(= 같은 scale/언어/transcript/segments/...)에 대한 재요청
+# (프론트 재시도, 중복 제출 등)은 LLM 을 다시 부르지 않고 이전 결과를 돌려준다.
+# 프로세스 로컬 캐시이므로 워커가 여러 개면 워커마다 따로 쌓인다.
+FEEDBACK_CACHE_TTL_SEC = 7 * 24 * 60 * 60  # 7일
+_feedback_cache: TTLCache = TTLCache(maxsize=1024, ttl=FEEDBACK_CACHE_TTL_SEC)
+
+
+# 응답 길이 상한. 스키마 자체는 수백 토큰이지만 coach 문구(한국어)가 길어질 수 있어
+# 잘림(→ JSON 파싱 실패)이 나지 않을 만큼 여유를 둔다.
+LLM_MAX_TOKENS = 1200
+
+# 동시에 나가는 LLM 호출 수 상한 (OpenAI rate limit 보호)
+LLM_MAX_CONCURRENCY = 32
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+def _feedback_cache_key(system_prompt: str, user_prompt: str) -> str:
+    # LLM 에 실제로 보내는 프롬프트 전체를 키로 사용 → 결과에 영향을 주는 입력이 빠질 일이 없음
+    h = hashlib.sha256(system_prompt.encode("utf-8"))
+    h.update(b"\0")
+    h.update(user_prompt.encode("utf-8"))
+    return h.hexdigest()
+
+
 # ---------- Pydantic 모델 ----------
 
-class Segment(BaseModel):
+# segments 는 transcript 한 줄마다 하나씩 들어오므로, 중첩 BaseModel 대신
+# TypedDict 로 두어 plain dict 로 검증한다 (인스턴스 생성 비용 없음).
+# → 핸들러에서는 seg["text"], seg.get("start") 처럼 dict 로 접근
+class Segment(TypedDict):
     speaker: str
-    start: Optional[float] = None
-    end: Optional[float] = None
+    start: NotRequired[Optional[float]]
+    end: NotRequired[Optional[float]]
     text: str
 
 
-class FeedbackContext(BaseModel):
-    case: Optional[str] = None
-    language: Optional[str] = None
-    note: Optional[str] = None
+class FeedbackContext(TypedDict, total=False):
+    case: Optional[str]
+    language: Optional[str]
+    note: Optional[str]
 
 
 class FeedbackRequest(BaseModel):
@@ -101,6 +575,17 @@ class FeedbackRequest(BaseModel):
     # 프론트에서 보내는 SPEAKER_00 → "지도전문의"/"전공의" 매핑
     speaker_mapping: Optional[Dict[str, str]] = None
 
+    @field_validator("language", mode="before")
+    @classmethod
+    def _normalize_language(cls, v: Any) -> Any:
+        # 핸들러에서는 SYSTEM_PROMPTS 키와 같은 소문자 코드로 바로 사용
+        if v is None or v == "":
+            return "ko"
+        if isinstance(v, str):
+            return v.lower()
+        # 문자열이 아니면 그대로 넘겨서 str 타입 검증이 422 로 거절하게 둔다
+        return v
+
 
 # 코칭 리포트에 대한 전반적 도움 정도(1~5점)를 받는 요청 모델
 class CoachEvalRequest(BaseModel):
@@ -138,14 +623,81 @@ class CoachMemoRequest(BaseModel):
     note: Optional[str] = None
 
 
-router = APIRouter(tags=["feedback"])
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# main.py 의 app 기본값과 같지만, 라우터만 따로 마운트해도 orjson 으로 응답하도록 명시
+router = APIRouter(tags=["feedback"], default_response_class=ORJSONResponse)
+
+
+def _json_body(model_cls: Type[ModelT]) -> Callable[[Request], Awaitable[ModelT]]:
+    """
+    request body 를 raw bytes 에서 바로 model_cls 로 검증하는 의존성을 만든다.
+    (FastAPI 기본 경로: json.loads 로 dict/list 를 만든 뒤 다시 검증.
+     segments 가 긴 /feedback 요청에서는 이 중간 객체 생성이 파싱 비용의 대부분)
+    """
+    async def parse(request: Request) -> ModelT:
+        try:
+            return model_cls.model_validate_json(await request.body())
+        except ValidationError as ve:
+            # FastAPI 기본 body 검증과 같은 422 응답 형식 유지 (loc 앞에 "body")
+            raise RequestValidationError(
+                [
+                    {**err, "loc": ("body", *err["loc"])}
+                    for err in ve.errors(include_url=False)
+                ]
+            )
+
+    return parse
 
 
-@router.post("/feedback")
-async def analyze_feedback(payload: FeedbackRequest) -> Dict[str, Any]:
+def _inline_schema_refs(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    model_json_schema() 의 "$defs" 참조(Segment 등)를 펼쳐서
+    openapi_extra 에 그대로 넣을 수 있는 자기완결 스키마로 만든다.
+    """
+    defs = schema.pop("$defs", {})
+
+    def resolve(node: Any) -> Any:
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {k: resolve(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [resolve(v) for v in node]
+        return node
+
+    return resolve(schema)
+
+
+def _json_body_openapi(model_cls: Type[BaseModel]) -> Dict[str, Any]:
+    """body 를 의존성에서 직접 파싱하므로 OpenAPI 문서용 스키마는 따로 달아 준다."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": _inline_schema_refs(model_cls.model_json_schema()),
+                },
+            },
+        },
+    }
+
+
+@router.post("/feedback", openapi_extra=_json_body_openapi(FeedbackRequest))
+async def analyze_feedback(
+    payload: FeedbackRequest = Depends(_json_body(FeedbackRequest)),
+    cache: Literal["readWrite", "readOnly", "writeOnly"] = "readWrite",
+) -> ORJSONResponse:
     """
     피드백 대화를 (기본: OSAD_DEBRIEFER 스케일, 선택 시: OMP_CLINICAL 등)
     기준으로 분석하고, 각 항목의 근거가 된 segment index를 evidence로 함께 돌려준다.
+
+    cache (query):
+    - readWrite: 캐시에 있으면 그대로 반환, 없으면 LLM 호출 후 저장 (기본)
+    - readOnly: 캐시 조회만 하고 새 결과는 저장하지 않음
+    - writeOnly: 캐시를 무시하고 LLM 을 다시 호출해서 결과를 갱신
     """
 
     transcript = payload.transcript.strip()
@@ -156,237 +708,138 @@ async def analyze_feedback(payload: FeedbackRequest) -> Dict[str, Any]:
         scale_code = "OSAD_DEBRIEFER"
     scale_cfg = SCALE_CONFIG[scale_code]
     max_total = scale_cfg["max_total"]
-    dimensions: List[str] = scale_cfg["dimensions"]
-    dimension_labels: Dict[str, str] = scale_cfg.get("dimension_labels", {})
+    dimensions: Tuple[str, ...] = scale_cfg["dimensions"]
 
-    # ---------- JSON 스키마(점수 / evidence) 문자열 동적 생성 ----------
-    # 점수 부분: "osad": { "<dim>": int(1-5), ... }
-    score_schema_lines: List[str] = []
-    for dim in dimensions:
-        score_schema_lines.append(f'    "{dim}": int (1-5),\n')
-    score_schema_text = "".join(score_schema_lines)
+    # ---------- 분석할 내용이 없으면 LLM 호출 없이 기본 응답 ----------
+    # (segments 없이 transcript 만 직접 입력하는 경우도 있으므로 길이만 본다)
+    if len(transcript) < MIN_TRANSCRIPT_CHARS:
+        return ORJSONResponse(EMPTY_FEEDBACK[scale_code])
 
-    # evidence 부분: "evidence": { "osad": { "<dim>": [int, ...], ... } }
-    ev_schema_lines: List[str] = []
-    for dim in dimensions:
-        ev_schema_lines.append(f'      "{dim}": [int, ...],\n')
-    evidence_schema_text = "".join(ev_schema_lines)
-
-    # 프롬프트에 보여줄 스케일 항목 설명 (있으면)
-    dimension_desc_text = ""
-    if dimension_labels:
-        desc_lines = []
-        for dim in dimensions:
-            label = dimension_labels.get(dim, dim)
-            desc_lines.append(f"- {dim}: {label}")
-        dimension_desc_text = "\n".join(desc_lines)
-
-    # ---------- segments 전체를 인덱스와 함께 문자열로 나열 ----------
+    # ---------- segments 한 번 순회로 두 가지를 같이 만든다 ----------
+    # 1) 전체 segments 를 인덱스와 함께 나열 (evidence 인덱스 기준)
+    # 2) speaker_mapping 을 이용해 '지도전문의 발언'만 따로 모으기
+    supervisor_only_text = ""
     if payload.segments:
-        lines = []
+        # 역할 매핑을 한 번 뒤집어 '지도전문의' speaker ID 집합으로 만들어 둔다
+        supervisor_speakers = frozenset(
+            speaker
+            for speaker, role in (payload.speaker_mapping or {}).items()
+            if role == SUPERVISOR_ROLE
+        )
+        # 설명 줄 수는 segments 수와 같으므로 미리 할당해 두고 인덱스로 채운다
+        desc_lines: List[str] = [""] * len(payload.segments)
+        supervisor_lines: List[str] = []
+        add_supervisor_line = supervisor_lines.append
         for idx, seg in enumerate(payload.segments):
-            lines.append(
-                f"[{idx}] speaker={seg.speaker}, "
-                f"start={seg.start}, end={seg.end}, text=\"{seg.text}\""
+            speaker = seg["speaker"]
+            desc_lines[idx] = (
+                f"[{idx}] speaker={speaker}, "
+                f"start={seg.get('start')}, end={seg.get('end')}, text=\"{seg['text']}\""
             )
-        segments_desc = "\n".join(lines)
+            if speaker in supervisor_speakers:
+                add_supervisor_line(seg["text"])
+        segments_desc = "\n".join(desc_lines)
+        supervisor_only_text = "\n".join(supervisor_lines)
     else:
         segments_desc = "(segments not provided)"
 
-    # ---------- speaker_mapping을 이용해 '지도전문의 발언'만 따로 모으기 ----------
-    supervisor_only_text = ""
-    if payload.segments and payload.speaker_mapping:
-        supervisor_lines: List[str] = []
-        for seg in payload.segments:
-            role = payload.speaker_mapping.get(seg.speaker)
-            if role == "지도전문의":
-                supervisor_lines.append(seg.text)
-        if supervisor_lines:
-            supervisor_only_text = "\n".join(supervisor_lines)
-
     context_desc = ""
-    if payload.context:
+    if payload.context is not None:
         context_desc = (
-            f"case={payload.context.case}, "
-            f"note={payload.context.note}"
-        )
-
-    # ---------- 출력 언어 결정 ----------
-    lang_code = (payload.language or "ko").lower()
-    lang_name_map = {
-        "ko": "Korean",
-        "en": "English",
-        "zh": "Chinese",
-        "es": "Spanish",
-        "ja": "Japanese",
-        "fr": "French",
-        "de": "German",
-        "auto": "auto",
-    }
-    output_lang_name = lang_name_map.get(
-        lang_code, "the same language as the conversation"
-    )
-
-    # ---------- 언어 지침 문장 ----------
-    if lang_code == "auto":
-        lang_instruction = (
-            "Infer the primary language used by the supervisor in the conversation "
-            "(especially from the 'Supervisor-only speech' section). "
-            "Write all explanation texts (strings) in that language. "
-            "If you cannot clearly infer the language, default to Korean."
-        )
-    else:
-        lang_instruction = (
-            f"Write all explanation texts (strings) in {output_lang_name}."
+            f"case={payload.context.get('case')}, "
+            f"note={payload.context.get('note')}"
         )
 
-    # ---------- system 프롬프트 ----------
-    system_prompt = (
-        "You are an expert in medical education and feedback.\n"
-        f"You are now using a feedback scale with code: {scale_code}, "
-        f"label: {scale_cfg['label']}.\n"
-        "You analyze a debriefing/feedback conversation between a supervisor "
-        "and a trainee (resident), then score it and provide coaching tips.\n\n"
-    )
+    # ---------- system 프롬프트 (사전 계산본 사용) ----------
+    system_prompt = SYSTEM_PROMPTS[scale_code]
 
-    if dimension_desc_text:
-        system_prompt += "This scale has the following dimensions:\n"
-        system_prompt += dimension_desc_text + "\n\n"
-
-    system_prompt += (
-        "You MUST reply in a single valid JSON object ONLY, with this schema:\n"
-        "{\n"
-        '  "osad": {\n'
-        f"{score_schema_text}"
-        '    "total": int,\n'
-        f'    "scale": int (use {max_total} as the maximum total score for this scale),\n'
-        '    "percent": number (0-100, optional)\n'
-        "  },\n"
-        '  "structure": {\n'
-        '    "has_opening": bool,\n'
-        '    "has_core": bool,\n'
-        '    "has_closing": bool\n'
-        "  },\n"
-        '  "coach": {\n'
-        '    "strengths": [string, ...],\n'
-        '    "improvements_top3": [string, ...],\n'
-        '    "script_next_time": string,\n'
-        '    "micro_habit_10sec": string\n'
-        "  },\n"
-        '  "evidence": {\n'
-        '    "osad": {\n'
-        f"{evidence_schema_text}"
-        "    }\n"
-        "  }\n"
-        "}\n\n"
-        "All evidence indices must refer to the segment indices given in the input.\n"
-        "Use only indices that exist. If there is no clear evidence, use an empty list.\n"
-        f"{lang_instruction}\n"
-        "If only the supervisor's speech is provided separately, "
-        "focus your scoring and coaching mainly on the supervisor's feedback behaviour.\n"
-    )
+    lang_code = payload.language  # validator 에서 이미 소문자로 정규화됨
+    lang_instruction = LANG_INSTRUCTIONS.get(lang_code)
+    if lang_instruction is None:
+        # 목록에 없는 언어 코드만 요청 시점에 생성
+        lang_instruction = _build_lang_instruction(lang_code)
 
     # ---------- user 프롬프트 ----------
-    user_prompt_parts = [
-        f"Language code from client: {payload.language}",
-        f"Trainee level: {payload.trainee_level}",
-        f"Scenario code: {payload.scenario_code}",
-        f"Scale code: {scale_code}",
-        f"Context: {context_desc}",
-        "",
-        "Full conversation transcript:",
-        "------------------------------------",
-        transcript,
-        "",
-        "Segments with indices:",
-        "------------------------------------",
-        segments_desc,
-    ]
-
-    if supervisor_only_text:
-        user_prompt_parts.extend(
-            [
-                "",
-                "Supervisor-only speech (extracted from segments based on speaker_mapping):",
-                "------------------------------------",
-                supervisor_only_text,
-                "",
-                "When scoring and generating coaching tips, "
-                "prioritize the supervisor-only speech above.",
-            ]
-        )
-
-    user_prompt_parts.append(
-        "\nNow analyze this feedback conversation using the specified scale "
-        "and respond ONLY with a JSON object following the required schema."
+    user_prompt = _build_user_prompt(
+        scale_code=scale_code,
+        lang_instruction=lang_instruction,
+        language=payload.language,
+        trainee_level=payload.trainee_level,
+        scenario_code=payload.scenario_code,
+        context_desc=context_desc,
+        transcript=transcript,
+        segments_desc=segments_desc,
+        supervisor_only_text=supervisor_only_text,
     )
 
-    user_prompt = "\n".join(user_prompt_parts)
+    # ---------- 응답 캐시 조회 ----------
+    cache_key = _feedback_cache_key(system_prompt, user_prompt)
+    if cache != "writeOnly":
+        cached = _feedback_cache.get(cache_key)
+        if cached is not None:
+            return ORJSONResponse(cached)
 
     try:
-        # ---------- ChatCompletion 호출 (JSON 모드) ----------
-        resp = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            temperature=0.2,
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-        )
-
-        content = resp.choices[0].message.content
-        data = json.loads(content)
-
-        # ---------- total / scale / percent 보정 (없으면 계산) ----------
-        osad = data.get("osad", {})
-
-        # total이 없으면 스케일의 dimensions 리스트를 기준으로 합산
-        if "total" not in osad:
-            numeric_scores: List[int] = []
-            for dim in dimensions:
-                val = osad.get(dim)
-                if isinstance(val, int):
-                    numeric_scores.append(val)
-            osad["total"] = sum(numeric_scores)
-
-
-
-        # 항상 이 스케일의 만점은 config에 정의된 값으로 강제
-        osad["scale"] = max_total
-
-        total_val = osad.get("total")
-        scale_val = max_total
-
-        # percent(0~100%) 계산: (total / scale_val) * 100
-        if isinstance(total_val, (int, float)) and scale_val > 0:
-            osad.setdefault(
-                "percent",
-                round(total_val / scale_val * 100, 1),
+        # ---------- ChatCompletion 호출 (Structured Outputs) ----------
+        # async 클라이언트로 await 해서 LLM 응답을 기다리는 동안 이벤트 루프를 막지 않는다.
+        async with _llm_semaphore:
+            resp = await openai_async_client.chat.completions.create(
+                model="gpt-4o-mini",
+                temperature=0.1,
+                max_tokens=LLM_MAX_TOKENS,
+                response_format=RESPONSE_FORMATS[scale_code],
+                # 같은 스케일 요청은 system 프롬프트 prefix 가 같으므로 같은 캐시 키로 묶어
+                # prompt caching 적중률을 높인다 (SDK 버전에 인자가 없어 extra_body 로 전달)
+                extra_body={"prompt_cache_key": f"feedback:{scale_code}"},
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
             )
-        else:
-            osad.setdefault("percent", 0.0)
 
-        data["osad"] = osad
+        message = resp.choices[0].message
+        if message.refusal:
+            raise HTTPException(
+                status_code=502,
+                detail=f"LLM refused to analyze: {message.refusal}",
+            )
 
-        # ---------- evidence.osad 기본 구조 보정 ----------
-        if "evidence" not in data:
-            data["evidence"] = {"osad": {}}
-        else:
-            if "osad" not in data["evidence"]:
-                data["evidence"]["osad"] = {}
+        # 스키마가 보장되므로 키 존재 여부 보정은 필요 없음
+        # (출력이 max_tokens 에서 잘린 경우만 아래 JSONDecodeError 로 감)
+        content = message.content
+        data = orjson.loads(content)
 
-        return data
+        # ---------- total / scale / percent 는 서버에서 계산 ----------
+        osad = data["osad"]
+        total_val = sum(osad[dim] for dim in dimensions)
+        osad["total"] = total_val
+        osad["scale"] = max_total
+        osad["percent"] = (
+            round(total_val / max_total * 100, 1) if max_total > 0 else 0.0
+        )
 
-    except json.JSONDecodeError as je:
-        print("=== DEBUG: /feedback JSON decode error ===", repr(je))
-        print("=== DEBUG: raw content ===", content)
+        if cache != "readOnly":
+            _feedback_cache[cache_key] = data
+
+        # LLM 이 준 JSON 을 그대로 내보내므로 jsonable_encoder 단계는 생략
+        return ORJSONResponse(data)
+
+    except HTTPException:
+        raise
+    except orjson.JSONDecodeError as je:
+        # 모델 출력 잘림 등 → WARNING (raw content 는 앞 500자만 남김)
+        # (%r 포맷은 로그가 실제로 출력될 때만 수행됨)
+        logger.warning(
+            "/feedback JSON decode error (raw content head=%r)",
+            content[:500] if content else content,
+            exc_info=True,
+        )
         raise HTTPException(
             status_code=500,
             detail=f"Failed to parse LLM JSON: {je}",
         )
     except Exception as e:
-        print("=== DEBUG: /feedback ERROR ===", repr(e))
+        logger.exception("/feedback analysis failed")
         raise HTTPException(
             status_code=500,
             detail=f"Feedback analysis failed: {e}",
@@ -395,22 +848,22 @@ async def analyze_feedback(payload: FeedbackRequest) -> Dict[str, Any]:
 
 # ---------- 코칭 리포트에 대한 전반적 도움 정도 평가 저장 ----------
 
-@router.post("/feedback/coach-eval")
-async def eval_coaching_report(
-    payload: CoachEvalRequest,
+@router.post("/feedback/coach-eval", openapi_extra=_json_body_openapi(CoachEvalRequest))
+def eval_coaching_report(
+    payload: CoachEvalRequest = Depends(_json_body(CoachEvalRequest)),
     db: Session = Depends(get_db),
-) -> Dict[str, Any]:
+) -> ORJSONResponse:
     """
     프론트에서 받은 '이 코칭 리포트가 얼마나 도움이 되었는지(1~5점)' 평가를
     coach_eval 테이블에 저장하는 엔드포인트.
+
+    동기 Session 을 쓰므로 일반 def 로 두어 threadpool 에서 실행한다
+    (async def 안에서 commit 하면 그동안 이벤트 루프 전체가 멈춤).
     """
     try:
-        # helpful_flags는 리스트일 수 있으므로 JSON 문자열로 변환
-        flags_json = None
-        if payload.helpful_flags is not None:
-            flags_json = json.dumps(payload.helpful_flags, ensure_ascii=False)
-
-        obj = CoachEval(
+        # ORM 객체 생성/flush 없이 Core INSERT ... RETURNING id 한 문장
+        # (identity map 등록 / unit-of-work 생략, 기본값은 Column default 가 그대로 적용)
+        stmt = insert(CoachEval).values(
             encounter_id=payload.encounter_id,
             supervisor_id=payload.supervisor_id,
             trainee_id=payload.trainee_id,
@@ -418,24 +871,24 @@ async def eval_coaching_report(
             scale_code=payload.scale_code,
             model_version=payload.model_version,
             helpful_score=payload.helpful_score,
-            helpful_flags=flags_json,
+            # JSON/JSONB 컬럼이라 리스트 그대로 저장
+            helpful_flags=payload.helpful_flags,
             comment=payload.comment,
-        )
-        db.add(obj)
+        ).returning(CoachEval.id)
+        obj_id = db.execute(stmt).scalar_one()
         db.commit()
-        db.refresh(obj)
 
-        return {
+        return ORJSONResponse({
             "status": "ok",
             "message": "coach-eval 저장 완료",
             "data": {
-                "id": obj.id,
-                "encounter_id": obj.encounter_id,
-                "helpful_score": obj.helpful_score,
+                "id": obj_id,
+                "encounter_id": payload.encounter_id,
+                "helpful_score": payload.helpful_score,
             },
-        }
+        })
     except Exception as e:
-        print("=== DEBUG: /feedback/coach-eval ERROR ===", repr(e))
+        logger.exception("/feedback/coach-eval save failed")
         db.rollback()
         raise HTTPException(
             status_code=500,
@@ -445,43 +898,42 @@ async def eval_coaching_report(
 
 # ---------- 코칭 리포트에서 '기록'으로 체크한 섹션 저장 ----------
 
-@router.post("/feedback/coach-memo")
-async def save_coaching_memo(
-    payload: CoachMemoRequest,
+@router.post("/feedback/coach-memo", openapi_extra=_json_body_openapi(CoachMemoRequest))
+def save_coaching_memo(
+    payload: CoachMemoRequest = Depends(_json_body(CoachMemoRequest)),
     db: Session = Depends(get_db),
-) -> Dict[str, Any]:
+) -> ORJSONResponse:
     """
     사용자가 '기록' 체크박스로 선택한 코칭 리포트 섹션을
     coach_memo 테이블에 저장하는 엔드포인트.
+    (coach-eval 과 같은 이유로 일반 def → threadpool 에서 실행)
     """
     try:
-        # saved_sections(dict)를 JSON 문자열로 저장
-        sections_json = json.dumps(payload.saved_sections, ensure_ascii=False)
-
-        obj = CoachMemo(
+        # coach-eval 과 같은 Core INSERT ... RETURNING id
+        stmt = insert(CoachMemo).values(
             encounter_id=payload.encounter_id,
             supervisor_id=payload.supervisor_id,
             trainee_id=payload.trainee_id,
             scenario_code=payload.scenario_code,
             scale_code=payload.scale_code,
             model_version=payload.model_version,
-            saved_sections=sections_json,
+            # JSON/JSONB 컬럼이라 dict 그대로 저장
+            saved_sections=payload.saved_sections,
             note=payload.note,
-        )
-        db.add(obj)
+        ).returning(CoachMemo.id)
+        obj_id = db.execute(stmt).scalar_one()
         db.commit()
-        db.refresh(obj)
 
-        return {
+        return ORJSONResponse({
             "status": "ok",
             "message": "coach-memo 저장 완료",
             "data": {
-                "id": obj.id,
-                "encounter_id": obj.encounter_id,
+                "id": obj_id,
+                "encounter_id": payload.encounter_id,
             },
-        }
+        })
     except Exception as e:
-        print("=== DEBUG: /feedback/coach-memo ERROR ===", repr(e))
+        logger.exception("/feedback/coach-memo save failed")
         db.rollback()
         raise HTTPException(
             status_code=500,
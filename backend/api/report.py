@@ -1,11 +1,13 @@
 # backend/api/report.py
-import os, io
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+import os, io, hashlib, threading
+from typing import Dict, Any, List
+from xml.sax.saxutils import escape
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Flowable, KeepTogether, Paragraph, SimpleDocTemplate, Spacer
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
@@ -24,6 +26,9 @@ class ReportBody(BaseModel):
 
 def register_korean_font():
     # 윈도우 기본 폰트 (맑은 고딕) 등록
+    # (pdfmetrics 폰트 레지스트리는 프로세스 전역이므로 이미 있으면 다시 파싱하지 않음)
+    if "Malgun" in pdfmetrics.getRegisteredFontNames():
+        return "Malgun"
     try:
         font_path = r"C:\Windows\Fonts\malgun.ttf"
         if os.path.exists(font_path):
@@ -33,89 +38,110 @@ def register_korean_font():
         pass
     return "Helvetica"  # 폴백 (영문 전용)
 
-def wrap_text(text: str, width: int):
-    words = text.split()
-    lines, cur = [], ""
-    for w in words:
-        if len(cur) + len(w) + 1 <= width:
-            cur = (cur + " " + w).strip()
-        else:
-            lines.append(cur)
-            cur = w
-    if cur: lines.append(cur)
-    return lines
+def _build_styles(font_name: str) -> Dict[str, ParagraphStyle]:
+    # 기존 drawString 좌표(x=40/45/50/55, 줄간격 14/12)에 맞춘 스타일
+    # wordWrap="CJK": 공백이 없는 긴 한국어 문장도 글자 단위로 줄바꿈
+    base = ParagraphStyle("base", fontName=font_name, fontSize=10, leading=12, wordWrap="CJK")
+    return {
+        "title": ParagraphStyle("title", parent=base, fontSize=16, leading=24),
+        "heading": ParagraphStyle("heading", parent=base, fontSize=12, leading=16, spaceBefore=10),
+        "summary": ParagraphStyle("summary", parent=base, leading=14, leftIndent=10),
+        "item": ParagraphStyle("item", parent=base, leading=14, leftIndent=5),
+        "detail": ParagraphStyle("detail", parent=base, leftIndent=15),
+    }
+
+
+def _para(text: str, style: ParagraphStyle) -> Paragraph:
+    # Paragraph 는 mini-HTML 을 해석하므로 사용자 텍스트의 <, >, & 는 이스케이프
+    return Paragraph(escape(text), style)
+
+
+# 폰트 등록(TTF 파싱)과 스타일 생성은 import 시 한 번만
+FONT_NAME = register_korean_font()
+STYLES = _build_styles(FONT_NAME)
+
+
+# ---------- 생성된 PDF 캐시 ----------
+
+# 같은 body → 같은 PDF (폰트/스타일은 import 시 고정) 이므로
+# body 해시를 캐시 키로 써서 같은 리포트 재요청 시 재렌더링 생략.
+# (POST 응답은 브라우저가 캐시하지 않으므로 ETag/304 는 두지 않고 서버 측 캐시만 사용)
+REPORT_CACHE_TTL_SEC = 60 * 60  # 1시간
+_report_cache: TTLCache = TTLCache(maxsize=256, ttl=REPORT_CACHE_TTL_SEC)
+# sync 엔드포인트는 threadpool 에서 동시에 돌고 TTLCache 는 thread-safe 하지 않으므로
+# get / set 만 잠근다 (렌더링은 잠금 밖에서 → 서로 다른 리포트는 병렬로 생성)
+_report_cache_lock = threading.Lock()
+
+
+def _report_cache_key(body: ReportBody) -> str:
+    return hashlib.blake2b(body.model_dump_json().encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _render_report_pdf(body: ReportBody) -> bytes:
+    """
+    줄바꿈/페이지 넘김은 platypus(SimpleDocTemplate + Paragraph)에 맡긴다.
+    (줄마다 drawString 을 부르고 y 좌표를 직접 계산하던 방식 대체)
+    """
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buf,
+        pagesize=A4,
+        leftMargin=40,
+        rightMargin=40,
+        topMargin=40,
+        bottomMargin=40,
+        title="OSAD Feedback Report",
+        producer="feedback-trainer",
+        # content stream zlib 압축 (rl_config 기본값에 의존하지 않고 명시)
+        pageCompression=1,
+    )
+    styles = STYLES
+
+    story: List[Flowable] = [_para("OSAD Feedback Report", styles["title"])]
+
+    # Summary
+    story.append(_para("Summary:", styles["heading"]))
+    story.append(_para(body.summary, styles["summary"]))
+
+    # Domains (한 항목의 점수/근거/제안은 같은 페이지에 유지)
+    story.append(_para("OSAD Domains:", styles["heading"]))
+    for name, ds in body.domains.items():
+        story.append(KeepTogether([
+            _para(f"- {name}: {ds.score}", styles["item"]),
+            _para(f"evidence: {ds.evidence}", styles["detail"]),
+            _para(f"suggestion: {ds.suggestion}", styles["detail"]),
+            Spacer(0, 6),
+        ]))
+
+    # Overall
+    story.append(_para("Overall:", styles["heading"]))
+    for key in ["strengths", "improvements", "action_plan"]:
+        vals = body.overall.get(key, [])
+        story.append(_para(f"- {key}:", styles["item"]))
+        for v in vals:
+            story.append(_para(f"• {v}", styles["detail"]))
+        story.append(Spacer(0, 4))
+
+    doc.build(story)
+    return buf.getvalue()
+
 
 @router.post("/report")
 def generate_report(body: ReportBody):
-    try:
-        buf = io.BytesIO()
-        c = canvas.Canvas(buf, pagesize=A4)
-        width, height = A4
-        font_name = register_korean_font()
-        c.setFont(font_name, 12)
-
-        y = height - 40
-        c.setFont(font_name, 16)
-        c.drawString(40, y, "OSAD Feedback Report")
-        y -= 24
-
-        # Summary
-        c.setFont(font_name, 12)
-        c.drawString(40, y, "Summary:")
-        y -= 16
-        c.setFont(font_name, 10)
-        for line in wrap_text(body.summary, 90):
-            c.drawString(50, y, line)
-            y -= 14
-
-        # Domains
-        y -= 10
-        c.setFont(font_name, 12)
-        c.drawString(40, y, "OSAD Domains:")
-        y -= 16
-        c.setFont(font_name, 10)
-        for name, ds in body.domains.items():
-            c.drawString(45, y, f"- {name}: {ds.score}")
-            y -= 14
-            for line in wrap_text(f"evidence: {ds.evidence}", 92):
-                c.drawString(55, y, line)
-                y -= 12
-            for line in wrap_text(f"suggestion: {ds.suggestion}", 92):
-                c.drawString(55, y, line)
-                y -= 12
-            y -= 6
-            if y < 80:
-                c.showPage()
-                y = height - 40
-                c.setFont(font_name, 10)
-
-        # Overall
-        y -= 10
-        c.setFont(font_name, 12)
-        c.drawString(40, y, "Overall:")
-        y -= 16
-        c.setFont(font_name, 10)
-        for key in ["strengths", "improvements", "action_plan"]:
-            vals = body.overall.get(key, [])
-            c.drawString(45, y, f"- {key}:")
-            y -= 14
-            for v in vals:
-                for line in wrap_text(f"• {v}", 95):
-                    c.drawString(55, y, line)
-                    y -= 12
-            y -= 4
-            if y < 80:
-                c.showPage()
-                y = height - 40
-                c.setFont(font_name, 10)
-
-        c.showPage()
-        c.save()
-        buf.seek(0)
-        return StreamingResponse(
-            buf,
-            media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=OSAD_Report.pdf"},
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"PDF generation failed: {e}")
+    cache_key = _report_cache_key(body)
+
+    with _report_cache_lock:
+        pdf = _report_cache.get(cache_key)
+    if pdf is None:
+        try:
+            pdf = _render_report_pdf(body)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"PDF generation failed: {e}")
+        with _report_cache_lock:
+            _report_cache[cache_key] = pdf
+
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": "attachment; filename=OSAD_Report.pdf"},
+    )
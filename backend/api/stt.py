@@ -1,13 +1,22 @@
 # backend/api/stt.py
 
 import os
-import io
-import json
+import asyncio
+import hashlib
+import logging
+import tempfile
+import uuid
+import weakref
 from pathlib import Path
+from typing import Any, Dict, Set, Tuple
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
-from openai import OpenAI
+import httpx
+from cachetools import TTLCache
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 # ----------------------------------------------------
 # 1) 프로젝트 루트(ai_feedback_mvp/.env)에서 .env 로드
@@ -17,14 +26,20 @@ from openai import OpenAI
 ROOT_DIR = Path(__file__).resolve().parents[2]  # .../ai_feedback_mvp
 ENV_PATH = ROOT_DIR / ".env"
 
-print("=== DEBUG[stt]: ROOT_DIR ===", ROOT_DIR)
-print("=== DEBUG[stt]: ENV PATH ===", ENV_PATH)
+logger = logging.getLogger(__name__)
 
-if ENV_PATH.exists():
+# 디버그 출력은 print 대신 logger.debug (LOG_LEVEL=DEBUG 일 때만 출력,
+# 인자는 %s 지연 포맷이라 꺼져 있으면 문자열도 만들지 않음)
+logger.debug("ROOT_DIR=%s, ENV_PATH=%s", ROOT_DIR, ENV_PATH)
+
+# OPENAI_API_KEY 가 이미 환경변수로 있으면(Render 배포 등) .env 확인/파싱은 생략
+if "OPENAI_API_KEY" in os.environ:
+    logger.debug("OPENAI_API_KEY 환경변수 사용 (.env 생략)")
+elif ENV_PATH.exists():
     load_dotenv(ENV_PATH)
-    print("=== DEBUG[stt]: .env 로드됨 ===")
+    logger.debug(".env 로드됨")
 else:
-    print("=== DEBUG[stt]: .env 파일이 존재하지 않음 (환경변수만 사용) ===")
+    logger.debug(".env 파일이 존재하지 않음 (환경변수만 사용)")
 
 # ----------------------------------------------------
 # 2) OPENAI_API_KEY 읽기
@@ -32,10 +47,6 @@ else:
 #    - Render: Render Environment에 넣어둔 값
 # ----------------------------------------------------
 api_key = os.getenv("OPENAI_API_KEY")
-print(
-    "=== DEBUG[stt]: LOADED API KEY (first 10 chars) ===",
-    api_key[:10] if api_key else "None",
-)
 
 if not api_key:
     # 여기서 바로 죽도록 해서, 잘못된 설정을 빨리 발견할 수 있게 함
@@ -44,16 +55,171 @@ if not api_key:
 # ----------------------------------------------------
 # 3) OpenAI 클라이언트 생성
 # ----------------------------------------------------
-client = OpenAI(api_key=api_key)
+# async def 엔드포인트(/api/stt, /feedback, /test-key 등)에서 이벤트 루프를 막지 않도록 쓰는 비동기 클라이언트
+# - HTTP/2: 동시 요청 여러 개를 적은 수의 TCP 커넥션 위에서 multiplex
+# - DefaultAsyncHttpxClient: openai SDK 기본 timeout / redirect 설정은 그대로 유지
+async_client = AsyncOpenAI(
+    api_key=api_key,
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    ),
+)
+
+# 동시에 돌리는 STT 호출 수 상한 (/api/stt + 백그라운드 작업 합산)
+STT_MAX_CONCURRENCY = 8
+_stt_semaphore = asyncio.Semaphore(STT_MAX_CONCURRENCY)
 
 # ----------------------------------------------------
 # 4) FastAPI 라우터
 # ----------------------------------------------------
 router = APIRouter(prefix="/api", tags=["stt"])
 
+STT_MODEL = "gpt-4o-transcribe-diarize"
+
+# OpenAI transcription API 의 파일 크기 상한 (넘으면 어차피 API 에서 거절됨)
+STT_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+
+def _validate_audio_upload(file: UploadFile) -> None:
+    if not file or not file.content_type:
+        raise HTTPException(
+            status_code=400,
+            detail="audio file required (field name: 'file')",
+        )
+
+    if not file.content_type.startswith("audio/"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"audio file required, got {file.content_type!r}",
+        )
+
+    # 빈 파일 / 너무 큰 파일은 해시 계산이나 OpenAI 업로드 전에 바로 거절
+    if file.size == 0:
+        raise HTTPException(status_code=400, detail="audio file is empty")
+
+    if file.size is not None and file.size > STT_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"audio file too large ({file.size} bytes, max {STT_MAX_UPLOAD_BYTES})",
+        )
+
+
+# multipart 경계/헤더 분량만큼 여유를 둔 요청 본문 상한
+STT_MAX_REQUEST_BYTES = STT_MAX_UPLOAD_BYTES + 64 * 1024
+
+
+class STTUploadLimitMiddleware:
+    """
+    /api/stt* 업로드의 Content-Length 가 상한을 넘으면 본문을 받기 전에 413 으로 거절.
+    (UploadFile 파라미터는 핸들러 실행 전에 본문 전체를 파싱하므로 핸들러 안에서는 늦음)
+    BaseHTTPMiddleware 를 쓰지 않는 순수 ASGI 미들웨어라 다른 요청에는 오버헤드 없음.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"].startswith("/api/stt")
+        ):
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > STT_MAX_REQUEST_BYTES:
+                        response = ORJSONResponse(
+                            {"detail": f"audio file too large (max {STT_MAX_UPLOAD_BYTES} bytes)"},
+                            status_code=413,
+                        )
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+
+def _to_stt_result(resp: Any) -> Dict[str, Any]:
+    # -------------------------
+    # 응답 객체를 dict로 변환
+    #  - openai SDK 는 diarized_json 응답을 항상 pydantic 모델로 파싱해서 돌려줌
+    #    (SDK 버전에 따라 클래스만 다름) → model_dump 한 번으로 처리
+    # -------------------------
+    data = resp if isinstance(resp, dict) else resp.model_dump()
+
+    # -------------------------
+    # 최종 응답 스키마 정리
+    # -------------------------
+    text = data.get("text")
+    return {
+        "text": text,
+        "language": data.get("language"),
+        "segments": data.get("segments") or [],
+        # ✅ 프론트에서 사용하는 필드 이름과 호환
+        "transcript": text,
+    }
+
+
+# ----------------------------------------------------
+# STT 결과 캐시
+#  - 같은 파일 재업로드(재시도, 화면 재진입 등)는 OpenAI 를 다시 부르지 않음
+#  - 키: 모델 + content_type + 파일 '전체' 바이트 해시
+#    (일부만 샘플링한 해시는 비슷한 녹음끼리 충돌할 수 있음)
+#  - 같은 키로 동시에 들어온 요청은 lock 으로 묶어 STT 를 한 번만 호출
+# ----------------------------------------------------
+STT_CACHE_TTL_SEC = 24 * 60 * 60  # 1일
+_stt_cache: TTLCache = TTLCache(maxsize=128, ttl=STT_CACHE_TTL_SEC)
+
+# 키별 lock (기다리는 요청이 모두 끝나면 자동으로 사라지도록 weak 참조로 보관)
+_stt_key_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB 씩 읽기/복사
+
+
+def _stt_cache_key(content_type: str, digest: str) -> str:
+    return f"{STT_MODEL}:{content_type}:{digest}"
+
+
+async def _fingerprint_upload(file: UploadFile) -> str:
+    # 청크 단위로 해시 (디스크로 넘어간 업로드는 UploadFile.read 가 threadpool 에서 읽음)
+    hasher = hashlib.blake2b(digest_size=16)
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        hasher.update(chunk)
+    await file.seek(0)
+    return hasher.hexdigest()
+
+
+async def _transcribe(cache_key: str, audio_file: Tuple[str, Any, str]) -> Dict[str, Any]:
+    lock = _stt_key_locks.get(cache_key)
+    if lock is None:
+        lock = _stt_key_locks[cache_key] = asyncio.Lock()
+
+    async with lock:
+        result = _stt_cache.get(cache_key)
+        if result is not None:
+            logger.debug("STT cache hit (%s)", cache_key)
+            return result
+
+        # - 언어는 자동 감지 (language 파라미터 미지정)
+        # - diarized_json 형식으로 받아 text + segments 동시 리턴
+        # - async 클라이언트로 await → STT 가 도는 동안(수 초~수십 초) 이벤트 루프를 막지 않음
+        async with _stt_semaphore:
+            resp = await async_client.audio.transcriptions.create(
+                model=STT_MODEL,
+                file=audio_file,
+                response_format="diarized_json",
+            )
+        logger.debug("STT raw resp type: %s", type(resp))
+
+        result = _to_stt_result(resp)
+        _stt_cache[cache_key] = result
+        return result
+
 
 @router.post("/stt")
-async def transcribe_audio(file: UploadFile = File(...)):
+async def transcribe_audio(
+    file: UploadFile = File(...),
+    include_segments: bool = True,
+):
     """
     음성 파일을 STT + Speaker Diarization까지 수행하는 엔드포인트
 
@@ -81,88 +247,146 @@ async def transcribe_audio(file: UploadFile = File(...)):
       ],
       "transcript": "전체 대화 한 줄 텍스트..."
     }
+
+    🔹 query: include_segments=false 이면 segments 를 빈 리스트로 보냄
+      (text/transcript 만 필요한 화면에서 응답 크기 절감)
     """
     # -------------------------
     # 1) 요청 검증
     # -------------------------
-    if not file or not file.content_type:
-        raise HTTPException(
-            status_code=400,
-            detail="audio file required (field name: 'file')",
-        )
-
-    if not file.content_type.startswith("audio/"):
-        raise HTTPException(
-            status_code=400,
-            detail=f"audio file required, got {file.content_type!r}",
-        )
+    _validate_audio_upload(file)
 
     try:
         # -------------------------
-        # 2) 업로드된 바이너리를 메모리 버퍼로 변환
+        # 2) 업로드 파일 객체를 그대로 전달
+        #    - UploadFile 은 이미 SpooledTemporaryFile (1MB 넘으면 디스크)에 담겨 있으므로
+        #      bytes 로 읽어 BytesIO 로 한 번 더 복사하지 않는다 (요청당 메모리 2배 방지)
+        #    - (파일명, 파일객체, content_type) 튜플로 넘겨 확장자/형식 정보 유지
+        #    - 캐시 키용 해시는 청크 단위로 읽어 계산한 뒤 처음으로 되감아 둔다
         # -------------------------
-        audio_bytes = await file.read()
-        audio_buffer = io.BytesIO(audio_bytes)
-        audio_buffer.name = file.filename or "recording.webm"
+        digest = await _fingerprint_upload(file)
+        audio_file = (file.filename or "recording.webm", file.file, file.content_type)
 
-        print("=== DEBUG[stt]: STT 호출 시작 ===")
+        logger.debug("STT 호출 시작 (filename=%s)", audio_file[0])
 
         # -------------------------
-        # 3) STT + Speaker Diarization 호출
-        #    - 언어는 자동 감지 (language 파라미터 미지정)
-        #    - diarized_json 형식으로 받아 text + segments 동시 리턴
+        # 3) STT + Speaker Diarization 호출 (같은 파일이면 캐시 결과)
         # -------------------------
-        resp = client.audio.transcriptions.create(
-            model="gpt-4o-transcribe-diarize",
-            file=audio_buffer,
-            response_format="diarized_json",
+        result = await _transcribe(
+            _stt_cache_key(file.content_type, digest), audio_file
         )
 
-        print("=== DEBUG[stt]: STT raw resp type ===", type(resp))
+        if not include_segments:
+            # 캐시에 있는 result 는 공유 객체이므로 수정하지 않고 얕은 복사본으로
+            result = {**result, "segments": []}
 
-        # -------------------------
-        # 4) 응답 객체를 dict로 변환 (여러 경우에 대비)
-        # -------------------------
-        if isinstance(resp, dict):
-            data = resp
-        elif hasattr(resp, "model_dump"):
-            # pydantic 기반 객체일 경우
-            data = resp.model_dump()
-        elif hasattr(resp, "to_dict"):
-            data = resp.to_dict()
-        elif isinstance(resp, str):
-            try:
-                data = json.loads(resp)
-            except Exception:
-                data = {"raw": resp}
-        else:
-            # 마지막 fallback: 가능한 속성만 추출
-            data = {
-                "text": getattr(resp, "text", None),
-                "language": getattr(resp, "language", None),
-                "segments": getattr(resp, "segments", None),
-            }
-
-        print("=== DEBUG[stt]: STT data ===", data)
+        logger.debug("STT result to client: %s", result)
+        # dict 를 그대로 return 하면 FastAPI 가 jsonable_encoder 로 segments 전체를
+        # 한 번 더 복사한 뒤 직렬화 → 이미 JSON 호환 값이므로 바로 orjson 으로 내보냄
+        return ORJSONResponse(result)
 
-        # -------------------------
-        # 5) 최종 응답 스키마 정리
-        # -------------------------
-        text = data.get("text")
-        language = data.get("language")
-        segments = data.get("segments") or []
-
-        result = {
-            "text": text,
-            "language": language,
-            "segments": segments,
-            # ✅ 프론트에서 사용하는 필드 이름과 호환
-            "transcript": text,
-        }
+    except Exception as e:
+        logger.exception("/api/stt failed")
+        raise HTTPException(status_code=500, detail=f"STT failed: {e}")
 
-        print("=== DEBUG[stt]: STT result to client ===", result)
-        return result
 
+# ----------------------------------------------------
+# 5) 비동기 STT 작업 (긴 녹음용)
+#    - POST /api/stt/jobs 는 업로드만 받아 job_id 를 바로(202) 돌려주고,
+#      STT 는 백그라운드 task 에서 돌린다 → 프록시 timeout 에 걸리는 긴 녹음도 처리 가능
+#    - 결과는 GET /api/stt/jobs/{job_id} 로 조회 (프로세스 로컬 저장소: 워커마다 따로)
+# ----------------------------------------------------
+
+STT_JOB_TTL_SEC = 60 * 60  # 결과 보관 1시간
+# 진행 중인 작업은 TTL/용량 초과로 쫓겨나면 안 되므로 일반 dict 에 두고,
+# 끝난(done/error) 결과만 TTLCache 로 옮긴다 (실행 중 작업 수만큼만 커짐)
+_stt_jobs_pending: Dict[str, Dict[str, Any]] = {}
+_stt_jobs: TTLCache = TTLCache(maxsize=256, ttl=STT_JOB_TTL_SEC)
+
+# create_task 결과를 참조해 두지 않으면 실행 도중 GC 될 수 있음
+_stt_job_tasks: Set["asyncio.Task[None]"] = set()
+
+SPOOL_MAX_MEMORY = 8 << 20  # 8MB 넘으면 디스크로
+
+# 대기/실행 중 작업 상한: 작업마다 업로드 사본(최대 25MB, 그중 8MB 까지 메모리)을 들고 있고
+# _stt_semaphore 는 Whisper 호출만 제한하므로, 몰려드는 업로드는 여기서 503 으로 끊는다
+STT_MAX_PENDING_JOBS = 32
+STT_JOBS_RETRY_AFTER_SEC = 30
+
+
+async def _run_stt_job(
+    job_id: str, cache_key: str, audio_file: Tuple[str, Any, str]
+) -> None:
+    try:
+        result = await _transcribe(cache_key, audio_file)
+        _stt_jobs[job_id] = {"status": "done", "result": result}
     except Exception as e:
-        print("=== DEBUG[stt]: STT ERROR ===", repr(e))
-        raise HTTPException(status_code=500, detail=f"STT failed: {e}")
+        logger.exception("STT job %s failed", job_id)
+        _stt_jobs[job_id] = {"status": "error", "detail": f"STT failed: {e}"}
+    finally:
+        # 결과를 넣은 뒤에 pending 에서 빼야 조회 사이에 404 가 나지 않음
+        _stt_jobs_pending.pop(job_id, None)
+        audio_file[1].close()
+
+
+@router.post("/stt/jobs", status_code=202)
+async def create_stt_job(file: UploadFile = File(...)):
+    """
+    /api/stt 와 같은 STT 를 백그라운드 작업으로 시작한다.
+
+    🔹 응답: { "job_id": "...", "status": "pending" }
+    """
+    _validate_audio_upload(file)
+
+    if len(_stt_jobs_pending) >= STT_MAX_PENDING_JOBS:
+        raise HTTPException(
+            status_code=503,
+            detail="too many STT jobs in progress, retry later",
+            headers={"Retry-After": str(STT_JOBS_RETRY_AFTER_SEC)},
+        )
+
+    # 업로드 복사(await) 도중 다른 요청이 상한 검사를 통과하지 않도록 자리를 먼저 잡는다
+    job_id = uuid.uuid4().hex
+    _stt_jobs_pending[job_id] = {"status": "pending"}
+
+    # UploadFile 은 응답이 나가면 닫히므로 백그라운드 작업용으로 따로 옮겨 둔다
+    # (복사하면서 캐시 키용 해시도 같이 계산)
+    # SPOOL_MAX_MEMORY 를 넘으면 write 가 디스크 I/O 가 되므로 threadpool 에서 실행
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        hasher = hashlib.blake2b(digest_size=16)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await run_in_threadpool(spool.write, chunk)
+            hasher.update(chunk)
+        spool.seek(0)
+    except BaseException:
+        # 업로드 중 끊김/취소: 잡아 둔 자리와 사본을 바로 돌려준다
+        _stt_jobs_pending.pop(job_id, None)
+        spool.close()
+        raise
+
+    task = asyncio.create_task(
+        _run_stt_job(
+            job_id,
+            _stt_cache_key(file.content_type, hasher.hexdigest()),
+            (file.filename or "recording.webm", spool, file.content_type),
+        )
+    )
+    _stt_job_tasks.add(task)
+    task.add_done_callback(_stt_job_tasks.discard)
+
+    return {"job_id": job_id, "status": "pending"}
+
+
+@router.get("/stt/jobs/{job_id}")
+async def get_stt_job(job_id: str):
+    """
+    🔹 응답
+      - 진행 중: { "job_id": "...", "status": "pending" }
+      - 완료:   { "job_id": "...", "status": "done", "result": { /api/stt 응답과 동일 } }
+      - 실패:   { "job_id": "...", "status": "error", "detail": "..." }
+    """
+    job = _stt_jobs_pending.get(job_id) or _stt_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="STT job not found (or expired)")
+    return ORJSONResponse({"job_id": job_id, **job})
@@ -1,22 +1,31 @@
 # backend/db.py
 
+import logging
 import os
 from pathlib import Path
-from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from typing import Any, Dict
+from urllib.parse import urlsplit, urlunsplit
 
+import orjson
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger(__name__)
 
 # ── 1) .env 로드 ──────────────────────────────────────
 BASE_DIR = Path(__file__).resolve().parents[1]  # ai_feedback_mvp
 ENV_PATH = BASE_DIR / ".env"
 
-if ENV_PATH.exists():
-    load_dotenv(ENV_PATH)
-    print("=== DEBUG[db]: .env 로드됨 ===", ENV_PATH)
-else:
-    print("=== DEBUG[db]: .env 파일을 찾지 못함 ===", ENV_PATH)
+# DATABASE_URL 이 이미 환경변수로 있으면(Render 배포 등) .env 확인/파싱은 생략
+if "DATABASE_URL" not in os.environ:
+    if ENV_PATH.exists():
+        load_dotenv(ENV_PATH)
+        logger.debug(".env 로드됨 %s", ENV_PATH)
+    else:
+        logger.debug(".env 파일을 찾지 못함 %s", ENV_PATH)
 
 # ── 2) DATABASE_URL 읽기 ─────────────────────────────
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -24,29 +33,34 @@ if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL 환경변수가 설정되어 있지 않습니다.")
 
 # ── 2-1) URL 정규화 (Render/SQLAlchemy 호환 + SSL 보강) ──
+LOCAL_DB_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
 def normalize_database_url(raw_url: str) -> str:
     """
     - 'postgres://' 스킴을 SQLAlchemy 표준 'postgresql://'로 변환
     - sslmode 파라미터가 없으면 sslmode=require를 보강 (특히 External DB URL 대응)
+    - SQLite / 로컬 DB(localhost) URL 은 SSL 보강 없이 그대로 사용
     """
     url = raw_url.strip()
 
     # SQLAlchemy는 'postgresql://' 권장
     if url.startswith("postgres://"):
-        url = url.replace("postgres://", "postgresql://", 1)
+        url = "postgresql://" + url[len("postgres://"):]
 
-    # URL 파싱 후 query 보강
+    # URL 을 한 번만 split 해서 query 만 보강 (기존 파라미터는 원문 그대로 유지)
     try:
-        p = urlparse(url)
-        q = dict(parse_qsl(p.query, keep_blank_values=True))
+        parts = urlsplit(url)
 
-        # 이미 sslmode가 있으면 유지, 없으면 require로 보강
-        if "sslmode" not in q:
-            q["sslmode"] = "require"
+        # 파일/로컬 DB 에는 SSL 이 필요 없음 (SQLite 는 sslmode 인자 자체를 거부)
+        if parts.scheme.startswith("sqlite") or parts.hostname in LOCAL_DB_HOSTS:
+            return url
 
-        new_query = urlencode(q, doseq=True)
-        p2 = p._replace(query=new_query)
-        return urlunparse(p2)
+        # 이미 sslmode가 있으면 유지, 없으면 require로 보강
+        if "sslmode=" not in parts.query:
+            query = (parts.query + "&sslmode=require").lstrip("&")
+            url = urlunsplit(parts._replace(query=query))
+        return url
     except Exception:
         # 파싱 실패 시 원문 반환(그래도 create_engine에서 에러가 명확히 뜸)
         return url
@@ -54,35 +68,114 @@ def normalize_database_url(raw_url: str) -> str:
 def mask_db_url_for_log(url: str) -> str:
     """로그에 비밀번호가 노출되지 않도록 마스킹"""
     try:
-        p = urlparse(url)
+        p = urlsplit(url)
         netloc = p.netloc
         if "@" in netloc and ":" in netloc.split("@")[0]:
             userinfo, hostinfo = netloc.split("@", 1)
             user = userinfo.split(":", 1)[0]
             netloc = f"{user}:***@{hostinfo}"
         p2 = p._replace(netloc=netloc)
-        return urlunparse(p2)
+        return urlunsplit(p2)
     except Exception:
         return "***"
 
 DATABASE_URL = normalize_database_url(DATABASE_URL)
 
-print("=== DEBUG[db]: USING DATABASE_URL (masked) ===", mask_db_url_for_log(DATABASE_URL))
+logger.info("USING DATABASE_URL (masked) %s", mask_db_url_for_log(DATABASE_URL))
 
 # ── 3) SQLAlchemy 기본 설정 ──────────────────────────
-# pool_pre_ping: 죽은 커넥션 자동 감지(배포 환경에서 유용)
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-    future=True,
-    pool_pre_ping=True,
+# SQLite: 물리 커넥션이 새로 열릴 때 한 번만 PRAGMA 설정
+# (풀에서 재사용되는 동안 페이지 캐시가 유지됨)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",     # 약 64MB 페이지 캐시
+    "PRAGMA busy_timeout=10000",
 )
 
+
+def _set_sqlite_pragmas(dbapi_conn, _conn_record):
+    cursor = dbapi_conn.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+# JSON/JSONB 컬럼 직렬화: stdlib json 대신 orjson (C 구현, 한글을 \uXXXX 로 이스케이프하지 않음)
+def _json_serializer(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+# Render free tier 처럼 유휴 시 프로세스가 내려가는 저트래픽 배포용:
+# DB_NULL_POOL=1 이면 커넥션 풀을 쓰지 않는다 (기본: QueuePool)
+DB_NULL_POOL = os.getenv("DB_NULL_POOL") == "1"
+
+
+def _build_engine(url: str) -> Engine:
+    """
+    URL 의 backend 종류를 한 번만 판별해서 그에 맞는 엔진 옵션으로 생성한다.
+
+    QueuePool 을 명시적으로 튜닝해서 요청마다 커넥션을 새로 맺지 않고 재사용
+    - pool_pre_ping: 죽은 커넥션 자동 감지(배포 환경에서 유용, 네트워크 DB 에만 적용)
+    - pool_recycle: 30분 지난 커넥션은 교체 (서버 측 idle timeout 대응)
+    """
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    # 'sqlite://' 처럼 파일 경로가 없어도 in-memory
+    is_sqlite_memory = is_sqlite and parsed.database in (None, "", ":memory:")
+
+    # (echo=False / future=True 는 SQLAlchemy 2.0 기본값이라 생략)
+    kwargs: Dict[str, Any] = {
+        "json_serializer": _json_serializer,
+        "json_deserializer": orjson.loads,
+    }
+    # in-memory SQLite 는 SingletonThreadPool 고정이라 풀 옵션을 주지 않음
+    if is_sqlite_memory:
+        pass
+    elif DB_NULL_POOL:
+        # 커넥션을 풀에 보관하지 않고 checkout 마다 새로 연결
+        # → 유휴 후 죽은 커넥션을 pre_ping 으로 다시 확인하는 왕복이 없음
+        kwargs["poolclass"] = NullPool
+    else:
+        kwargs.update(
+            # SQLite 파일은 끊길 네트워크가 없으므로 checkout 마다 SELECT 1 을 보내지 않음
+            pool_pre_ping=not is_sqlite,
+            pool_size=20,
+            max_overflow=10,
+            pool_timeout=30,
+            pool_recycle=1800,
+        )
+    if is_sqlite:
+        # FastAPI threadpool 에서 커넥션을 공유하므로 같은 스레드 체크 해제,
+        # 쓰기 잠금은 최대 10초 대기
+        kwargs["connect_args"] = {"check_same_thread": False, "timeout": 10}
+
+    new_engine = create_engine(parsed, **kwargs)
+    if is_sqlite:
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+engine = _build_engine(DATABASE_URL)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+
+# SQLAlchemy 2.0 방식의 declarative base (기존 Column(...) 선언 모델도 그대로 동작)
+class Base(DeclarativeBase):
+    pass
+
 
 # ── 4) 의존성 주입용 세션 함수 ───────────────────────
 def get_db():
+    """
+    요청 하나당 세션 하나. 모든 엔드포인트는 SessionLocal() 을 직접 열지 말고
+    Depends(get_db) 로 받는다 (dependency_overrides 로 테스트 DB 교체 가능).
+
+    scoped_session(스레드 로컬)은 쓰지 않는다: FastAPI threadpool 은 스레드를
+    여러 요청이 돌려 쓰므로, 동시에 처리 중인 두 요청이 같은 Session 을 받을 수 있다.
+    """
     db = SessionLocal()
     try:
         yield db
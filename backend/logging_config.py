@@ -0,0 +1,31 @@
+# backend/logging_config.py
+
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+def setup_logging() -> None:
+    """
+    root logger 에 QueueHandler 만 달고, 실제 stdout 출력은
+    QueueListener 의 백그라운드 스레드가 처리한다.
+    (요청 처리 스레드/이벤트 루프가 stdout 쓰기에 막히지 않도록)
+    """
+    root = logging.getLogger()
+    if any(isinstance(h, QueueHandler) for h in root.handlers):
+        return  # reload 등으로 두 번 import 되는 경우
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    )
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    listener.start()
+    atexit.register(listener.stop)
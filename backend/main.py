@@ -1,50 +1,123 @@
 ﻿# backend/main.py
 
+import asyncio
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import Set
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from sqlalchemy import text
+import orjson
+from sqlalchemy import DateTime, bindparam, inspect, text
 from sqlalchemy.exc import SQLAlchemyError
-import time
+from sqlalchemy.orm import configure_mappers
+
+# 🔹 로깅: backend.db 등의 import 시점 로그도 잡히도록 다른 backend 모듈보다 먼저 설정
+from backend.logging_config import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # 🔹 DB 관련
 from backend.db import Base, engine
 import backend.models  # DbHealthCheck, CoachEval, CoachMemo 등 전체 모델 import
+from backend.models import CoachEval, CoachMemo
+
+# relationship(Scenario ↔ Scale ↔ ScaleItem) 해석을 import 시점에 한 번 끝내 둔다
+# (안 하면 첫 ORM 쿼리를 처리하는 요청이 mapper 설정 비용을 떠안음)
+configure_mappers()
 
 # 🔹 API 라우터들
-from backend.api.stt import router as stt_router, client as stt_client
+from backend.api.stt import (
+    router as stt_router,
+    async_client as stt_async_client,
+    STTUploadLimitMiddleware,
+)
 from backend.api.feedback import router as feedback_router
 from backend.api.report import router as report_router
 from backend.api.db_test import router as db_debug_router
-from backend.api import coach_eval
 from backend.api.db_admin import router as db_admin_router  # ★ DB admin 라우터
 
+
+# =========================
+# lifespan (startup / shutdown)
+# =========================
+# startup DB 초기화를 기다리는 최대 시간. 넘으면 DB 초기화는 worker thread 에서
+# 계속 진행되고 앱은 먼저 뜬다 (끝나면 init_db 가 DB_READY 를 갱신 → /readyz 반영)
+DB_STARTUP_TIMEOUT_SEC = 2.0
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 동기 엔진으로 하는 DB 체크/create_all 을 이벤트 루프 밖(worker thread)에서 실행
+    try:
+        await asyncio.wait_for(asyncio.to_thread(init_db), DB_STARTUP_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        logger.warning("STARTUP: DB 초기화가 %ss 안에 끝나지 않음 → 백그라운드에서 계속", DB_STARTUP_TIMEOUT_SEC)
+    yield
+    # 종료 시 풀에 남은 커넥션 정리
+    engine.dispose()
+
+
 app = FastAPI(
     title="AI Feedback MVP",
     version="0.1.0",
     description="지도전문의·전공의 피드백 대화 STT + OSAD/OMP 분석용 MVP 백엔드",
+    # dict 응답을 stdlib json 대신 orjson(C 구현)으로 직렬화
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# =========================
+# STT 업로드 크기 제한
+# =========================
+# 25MB 초과 업로드는 본문 전송 전에 413 (OpenAI 로 보내봐야 거절됨)
+# CORS 보다 먼저 등록 → CORS 가 바깥쪽이라 413 응답에도 CORS 헤더가 붙음
+app.add_middleware(STTUploadLimitMiddleware)
+
 # =========================
 # CORS 설정
 # =========================
+# ALLOWED_ORIGINS="https://a.example.com,https://b.example.com" 처럼 콤마로 지정 (import 시 한 번만 파싱)
+# 미설정이면 기존처럼 모든 origin 허용. 프리뷰 배포 등은 ALLOWED_ORIGIN_REGEX 로 추가 가능
+# (예: ^https://.*\.vercel\.app$)
+ALLOWED_ORIGINS = tuple(
+    o.strip() for o in os.getenv("ALLOWED_ORIGINS", "*").split(",") if o.strip()
+)
+ALLOWED_ORIGIN_REGEX = os.getenv("ALLOWED_ORIGIN_REGEX") or None
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],      # 배포 시에는 특정 도메인으로 제한 권장
+    allow_origins=ALLOWED_ORIGINS,
+    allow_origin_regex=ALLOWED_ORIGIN_REGEX,
     allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # 실제로 쓰는 메서드/헤더만 허용 (라우트는 GET/POST 뿐, 프론트는 Content-Type 만 보냄)
+    # (인증 헤더/조건부 요청(ETag) 은 쓰지 않으므로 Authorization / If-None-Match 는 허용하지 않음)
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type"],
+    # preflight 결과를 브라우저가 1시간 캐시 → 같은 엔드포인트 재호출 시 OPTIONS 왕복 생략
+    max_age=3600,
 )
 
-print("=== CORS ALLOW_ORIGINS === * (all origins allowed)")
+logger.info("CORS ALLOW_ORIGINS=%s regex=%s", ALLOWED_ORIGINS, ALLOWED_ORIGIN_REGEX)
 # =========================
 # 런타임 상태 플래그 (Render 진단용)
 # =========================
-APP_STARTED_AT = time.time()
 DB_READY = False
 DB_LAST_ERROR = None
 
+# 스키마를 Alembic 등으로 따로 관리하는 배포에서는 DB_CREATE_ALL=0 으로
+# startup 의 테이블 생성/확인 단계를 통째로 건너뛴다 (기본: 수행)
+DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "1") != "0"
+
+# startup / readyz 의 DB 확인 쿼리: 고정 SQL 이라 exec_driver_sql 로 DBAPI 에 바로 넘김
+# (text() 컴파일 캐시 조회 / 파라미터 처리 생략)
+PING_SQL = "SELECT 1"
+
 
 # =========================
 # 헬스 체크용 스키마
@@ -57,9 +130,126 @@ class HealthResponse(BaseModel):
 # =========================
 # 서버 시작 시 DB 테이블 생성
 # =========================
-@app.on_event("startup")
-def on_startup():
+# 예전에는 Text 로 선언했던 JSON 컬럼 (모델은 이제 JSONB)
+JSONB_UPGRADE_COLUMNS = (
+    ("coach_eval", "helpful_flags"),
+    ("coach_memo", "saved_sections"),
+)
+
+
+def _convert_json_text_columns(conn, existing: Set[str]) -> None:
+    """
+    text 컬럼이면 psycopg2 가 str 을 그대로 돌려주므로 (jsonb 면 list/dict 로 디코딩)
+    information_schema 에서 아직 text 인 컬럼만 골라 jsonb 로 변환한다.
+    변환에 실패해도(파싱 불가 값 등) 해당 컬럼만 건너뛰고 기동은 계속한다.
     """
+    targets = [(t, c) for t, c in JSONB_UPGRADE_COLUMNS if t in existing]
+    if not targets:
+        return
+
+    rows = conn.execute(
+        text(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND data_type = 'text' "
+            "AND table_name IN :tables AND column_name IN :columns"
+        ).bindparams(
+            bindparam("tables", expanding=True),
+            bindparam("columns", expanding=True),
+        ),
+        {"tables": [t for t, _ in targets], "columns": [c for _, c in targets]},
+    ).all()
+    text_columns = {(r.table_name, r.column_name) for r in rows}
+
+    quote = conn.dialect.identifier_preparer.quote
+    for table, column in targets:
+        if (table, column) not in text_columns:
+            continue
+        logger.info("STARTUP: %s.%s text → jsonb 변환", table, column)
+        try:
+            # savepoint 안에서 실행 → 실패해도 바깥 트랜잭션(create_all 등)은 유지
+            with conn.begin_nested():
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(column)} "
+                    f"TYPE jsonb USING {quote(column)}::jsonb"
+                )
+        except SQLAlchemyError as e:
+            logger.error("STARTUP: %s.%s jsonb 변환 실패 %s", table, column, e)
+
+
+def _convert_naive_timestamp_columns(conn, existing: Set[str]) -> None:
+    """
+    모델의 timestamptz(DateTime(timezone=True)) 컬럼 중 기존 배포 테이블에서
+    아직 timestamp(without time zone) 인 컬럼을 timestamptz 로 변환하고 DEFAULT now() 를 붙인다.
+    기존 값은 파이썬 datetime.utcnow() 로 넣은 UTC 였으므로 AT TIME ZONE 'UTC' 로 해석한다.
+    (그대로 두면 now() 가 DB 서버 timezone 의 로컬 시각으로 잘려 저장됨)
+    """
+    targets = [
+        (table.name, column.name)
+        for table in Base.metadata.sorted_tables
+        if table.name in existing
+        for column in table.columns
+        if isinstance(column.type, DateTime) and column.type.timezone
+    ]
+    if not targets:
+        return
+
+    rows = conn.execute(
+        text(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() "
+            "AND data_type = 'timestamp without time zone' "
+            "AND table_name IN :tables AND column_name IN :columns"
+        ).bindparams(
+            bindparam("tables", expanding=True),
+            bindparam("columns", expanding=True),
+        ),
+        {"tables": [t for t, _ in targets], "columns": [c for _, c in targets]},
+    ).all()
+    naive_columns = {(r.table_name, r.column_name) for r in rows}
+
+    quote = conn.dialect.identifier_preparer.quote
+    for table, column in targets:
+        if (table, column) not in naive_columns:
+            continue
+        logger.info("STARTUP: %s.%s timestamp → timestamptz 변환", table, column)
+        try:
+            with conn.begin_nested():
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {quote(table)} "
+                    f"ALTER COLUMN {quote(column)} TYPE timestamptz "
+                    f"USING {quote(column)} AT TIME ZONE 'UTC', "
+                    f"ALTER COLUMN {quote(column)} SET DEFAULT now()"
+                )
+        except SQLAlchemyError as e:
+            logger.error("STARTUP: %s.%s timestamptz 변환 실패 %s", table, column, e)
+
+
+def _upgrade_existing_tables(conn, existing: Set[str]) -> None:
+    """
+    create_all 은 이미 있는 테이블을 건드리지 않으므로,
+    나중에 모델에 추가된 스키마 변경을 기존 배포 테이블에 보강한다 (여러 번 실행해도 안전).
+    - coach_eval / coach_memo 의 (encounter_id, created_at) 복합 인덱스
+    - Postgres: text 로 만들어진 JSON 컬럼을 jsonb 로 변환
+    - Postgres: timestamp(without time zone) 로 만들어진 시각 컬럼을 timestamptz 로 변환
+    """
+    if conn.dialect.name == "postgresql":
+        _convert_json_text_columns(conn, existing)
+        _convert_naive_timestamp_columns(conn, existing)
+
+    insp = inspect(conn)
+    for table in (CoachEval.__table__, CoachMemo.__table__):
+        if table.name not in existing:
+            continue  # 방금 create_all 로 만든 테이블은 이미 최신
+        have = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in have:
+                logger.info("STARTUP: 인덱스 추가 %s", index.name)
+                index.create(conn)
+
+
+def init_db():
+    """
+    lifespan 에서 worker thread 로 호출된다.
     배포 환경(Render)에서는 DB 연결 문제가 있을 수 있으므로,
     startup에서 DB 실패가 앱 전체 기동 실패로 이어지지 않게 한다.
     - healthz: 앱 프로세스 생존 여부 (DB 무관)
@@ -67,100 +257,149 @@ def on_startup():
     """
     global DB_READY, DB_LAST_ERROR
 
-    print("=== STARTUP: 앱 기동 시작 ===")
+    logger.info("STARTUP: 앱 기동 시작")
     DB_READY = False
     DB_LAST_ERROR = None
 
     # 1) DB 연결 체크 (짧게)
     try:
-        print("=== STARTUP: DB 연결 체크 시작 ===")
+        logger.info("STARTUP: DB 연결 체크 시작")
         with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        print("=== STARTUP: DB 연결 체크 OK ===")
+            conn.exec_driver_sql(PING_SQL)
+        logger.info("STARTUP: DB 연결 체크 OK")
     except SQLAlchemyError as e:
         DB_LAST_ERROR = f"DB connect failed: {e}"
-        print(f"=== STARTUP: DB 연결 실패 === {DB_LAST_ERROR}")
+        logger.error("STARTUP: DB 연결 실패 %s", DB_LAST_ERROR)
         # DB가 안 돼도 앱은 떠야 하므로 return 하지 않고 계속 진행
         return
     except Exception as e:
         DB_LAST_ERROR = f"Unexpected DB error: {e}"
-        print(f"=== STARTUP: DB 예외 === {DB_LAST_ERROR}")
+        logger.error("STARTUP: DB 예외 %s", DB_LAST_ERROR)
         return
 
     # 2) 테이블 생성/확인 (DB가 되는 경우에만)
+    if not DB_CREATE_ALL:
+        DB_READY = True
+        logger.info("STARTUP: DB_CREATE_ALL=0 → 테이블 생성/확인 생략 (DB_READY=True)")
+        return
+
     try:
-        print("=== STARTUP: DB 테이블 생성/확인 시작 ===")
-        Base.metadata.create_all(bind=engine)
+        logger.info("STARTUP: DB 테이블 생성/확인 시작")
+        # 기존 테이블 목록을 쿼리 한 번으로 받아서 없는 테이블만 create_all
+        # (create_all 단독은 테이블마다 존재 여부를 따로 조회 → 테이블 수만큼 왕복)
+        with engine.begin() as conn:
+            existing = set(inspect(conn).get_table_names())
+            missing = [t for t in Base.metadata.sorted_tables if t.name not in existing]
+            if missing:
+                Base.metadata.create_all(bind=conn, tables=missing)
+            _upgrade_existing_tables(conn, existing)
         DB_READY = True
-        print("=== STARTUP: DB 테이블 생성/확인 완료 (DB_READY=True) ===")
+        logger.info("STARTUP: DB 테이블 생성/확인 완료 (DB_READY=True)")
     except SQLAlchemyError as e:
         DB_LAST_ERROR = f"DB create_all failed: {e}"
         DB_READY = False
-        print(f"=== STARTUP: DB 테이블 생성 실패 === {DB_LAST_ERROR}")
+        logger.error("STARTUP: DB 테이블 생성 실패 %s", DB_LAST_ERROR)
     except Exception as e:
         DB_LAST_ERROR = f"Unexpected create_all error: {e}"
         DB_READY = False
-        print(f"=== STARTUP: create_all 예외 === {DB_LAST_ERROR}")
+        logger.error("STARTUP: create_all 예외 %s", DB_LAST_ERROR)
 
 
 
 # =========================
 # 기본 헬스 체크 엔드포인트
 # =========================
-@app.get("/", response_model=HealthResponse)
-def root():
-    return HealthResponse(
-        status="AI Feedback MVP Server Running",
-        version="0.1.0",
-    )
+# 고정 응답은 import 시 한 번만 JSON bytes 로 인코딩해 두고 매 요청 그대로 내보냄
+# (response_model 검증/직렬화 생략, 문서용 스키마는 "/" 에만 responses= 로 노출하고
+#  프로브용 엔드포인트는 include_in_schema=False 로 openapi.json 에서 제외)
+# Response 객체는 미들웨어가 헤더를 고쳐 쓸 수 있어서 공유하지 않고 매번 새로 만든다
+# (블로킹 작업이 없으므로 async def → threadpool 디스패치도 생략)
+ROOT_BODY = orjson.dumps({"status": "AI Feedback MVP Server Running", "version": "0.1.0"})
+HEALTH_BODY = orjson.dumps({"status": "ok", "version": "0.1.0"})
+# liveness: DB 등 외부 의존성 없이 고정 응답만 (프로브 비용 최소화)
+HEALTHZ_BODY = orjson.dumps({"status": "alive", "version": "0.1.0"})
 
 
-@app.get("/health", response_model=HealthResponse)
-def health():
-    return HealthResponse(status="ok", version="0.1.0")
+@app.get("/", responses={200: {"model": HealthResponse}})
+async def root():
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 
+@app.get("/health", include_in_schema=False)
+async def health():
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
-@app.get("/healthz")
-def healthz():
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
     # DB와 무관하게 프로세스가 떠 있으면 OK
-    uptime_sec = int(time.time() - APP_STARTED_AT)
-    return {"status": "alive", "uptime_sec": uptime_sec, "version": "0.1.0"}
+    return Response(content=HEALTHZ_BODY, media_type="application/json")
+
+
+# readiness: 요청마다 DB 를 실제로 찔러보는 시간 상한
+READYZ_DB_TIMEOUT_SEC = 2.0
+
 
+def _probe_db() -> None:
+    with engine.connect() as conn:
+        conn.exec_driver_sql(PING_SQL)
 
 
-@app.get("/readyz")
-def readyz():
-    # DB까지 준비되면 ready
-    if DB_READY:
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    # startup 의 DB 초기화(create_all)가 아직 안 끝났거나 실패한 경우
+    if not DB_READY:
+        # 원인 노출(배포 진단용)
+        return ORJSONResponse(
+            {"status": "not_ready", "db": "not_ready", "error": DB_LAST_ERROR, "version": "0.1.0"},
+            status_code=503,
+        )
+
+    # startup 이후 DB 장애도 반영되도록 매번 SELECT 1 (동기 엔진이라 worker thread 에서)
+    try:
+        await asyncio.wait_for(asyncio.to_thread(_probe_db), READYZ_DB_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        error = f"DB probe timed out after {READYZ_DB_TIMEOUT_SEC}s"
+    except Exception as e:
+        error = f"DB probe failed: {e}"
+    else:
         return {"status": "ready", "db": "ok", "version": "0.1.0"}
 
-    # DB가 아직 준비 안 된 경우, 원인 노출(배포 진단용)
-    return {
-        "status": "not_ready",
-        "db": "not_ready",
-        "error": DB_LAST_ERROR,
-        "version": "0.1.0",
-    }
+    return ORJSONResponse(
+        {"status": "not_ready", "db": "error", "error": error, "version": "0.1.0"},
+        status_code=503,
+    )
 
 
 
 # =========================
 # OpenAI API 테스트
 # =========================
-@app.get("/test-key")
-def test_key():
+# 성공한 확인 결과만 잠깐 재사용 (매 호출마다 OpenAI 왕복 + rate limit 소모 방지)
+TEST_KEY_CACHE_TTL_SEC = 300
+_test_key_cache = {"at": 0.0, "value": None}
+
+
+@app.get("/test-key", include_in_schema=False)
+async def test_key():
     """
-    STT에서 사용하는 OpenAI client(stt_client)가
+    STT에서 사용하는 OpenAI client(stt_async_client)가
     정상적으로 동작하는지 간단히 확인하는 엔드포인트.
     """
+    now = time.monotonic()
+    if _test_key_cache["value"] is not None and now - _test_key_cache["at"] < TEST_KEY_CACHE_TTL_SEC:
+        return _test_key_cache["value"]
+
     try:
-        models = stt_client.models.list()
+        models = await stt_async_client.models.list()
         first_model = models.data[0].id if models.data else None
-        return {"ok": True, "example_model": first_model}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
+    result = {"ok": True, "example_model": first_model}
+    _test_key_cache.update(at=now, value=result)
+    return result
+
 
 # =========================
 # API 라우터 등록
@@ -174,9 +413,6 @@ app.include_router(feedback_router)
 # 코칭 리포트 평가/메모 집계를 위한 추가 라우터 (report)
 app.include_router(report_router)
 
-# coach_eval용 예전 라우터(호환 목적)
-app.include_router(coach_eval.router)
-
 # DB 디버그용 (/db/info, /db/tables 등)
 app.include_router(db_debug_router)
 
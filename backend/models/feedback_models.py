@@ -1,17 +1,33 @@
 # backend/models/feedback_models.py
 
-from datetime import datetime
 from typing import Optional
 
 from sqlalchemy import (
+    JSON,
     Column,
+    Index,
     Integer,
     String,
     Text,
     DateTime,
+    func,
 )
+from sqlalchemy.dialects.postgresql import JSONB
+
 from backend.db import Base
 
+# Postgres 에서는 JSONB(바이너리 저장, 드라이버가 바로 dict/list 로 디코딩),
+# SQLite 등에서는 JSON(텍스트 저장) → 라우터에서 json dumps/loads 를 직접 하지 않는다.
+# 기존 Text 컬럼으로 만들어진 Postgres 테이블은 create_all 이 바꾸지 않으므로
+# main.init_db 가 기동 시 아직 text 인 컬럼을 jsonb 로 변환한다 (USING col::jsonb).
+# none_as_null: 파이썬 None 은 JSON 'null' 이 아니라 SQL NULL 로 저장 (기존 Text 컬럼과 동일)
+JSONColumn = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+# "encounter 별 최신순" 조회를 인덱스 하나로 (WHERE encounter_id = ? ORDER BY created_at DESC)
+# 기존 배포 테이블에는 create_all 이 인덱스를 만들지 않으므로 main.init_db 가 없는 인덱스를 보강한다.
+# created_at: DB 시각(timestamptz). default=func.now() 로 INSERT 문에 now() 를 직접 넣으므로
+# DEFAULT 가 없는 기존 테이블도 채워지고, 기존 timestamp 컬럼은 main.init_db 가 timestamptz 로 변환한다.
+
 
 class CoachEval(Base):
     """
@@ -19,10 +35,14 @@ class CoachEval(Base):
     """
 
     __tablename__ = "coach_eval"
+    __table_args__ = (
+        Index("ix_coach_eval_enc_created", "encounter_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
 
-    encounter_id = Column(String(100), index=True, nullable=True)
+    # encounter_id 단독 조회도 아래 복합 인덱스(encounter_id, created_at)가 처리
+    encounter_id = Column(String(100), nullable=True)
     supervisor_id = Column(String(100), index=True, nullable=True)
     trainee_id = Column(String(100), index=True, nullable=True)
 
@@ -31,11 +51,13 @@ class CoachEval(Base):
     model_version = Column(String(100), nullable=True)
 
     helpful_score = Column(Integer, nullable=False)  # 1~5
-    # ["strengths", "improvements_top3"] 같은 리스트를 JSON 문자열로 저장
-    helpful_flags = Column(Text, nullable=True)
+    # ["strengths", "improvements_top3"] 같은 리스트
+    helpful_flags = Column(JSONColumn, nullable=True)
     comment = Column(Text, nullable=True)
 
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now()
+    )
 
 
 class CoachMemo(Base):
@@ -44,10 +66,14 @@ class CoachMemo(Base):
     """
 
     __tablename__ = "coach_memo"
+    __table_args__ = (
+        Index("ix_coach_memo_enc_created", "encounter_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
 
-    encounter_id = Column(String(100), index=True, nullable=True)
+    # encounter_id 단독 조회도 아래 복합 인덱스(encounter_id, created_at)가 처리
+    encounter_id = Column(String(100), nullable=True)
     supervisor_id = Column(String(100), index=True, nullable=True)
     trainee_id = Column(String(100), index=True, nullable=True)
 
@@ -55,8 +81,10 @@ class CoachMemo(Base):
     scale_code = Column(String(50), nullable=False, default="OSAD_DEBRIEFER")
     model_version = Column(String(100), nullable=True)
 
-    # {"strengths": "...", "script_next_time": "..."} 를 JSON 문자열로 저장
-    saved_sections = Column(Text, nullable=False)
+    # {"strengths": "...", "script_next_time": "..."}
+    saved_sections = Column(JSONColumn, nullable=False)
     note = Column(Text, nullable=True)
 
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now()
+    )
@@ -1,8 +1,6 @@
 # backend/models/health_check.py
 
-from datetime import datetime
-
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, func
 
 from backend.db import Base
 
@@ -20,7 +18,10 @@ class DbHealthCheck(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     # 예: "init", "test", "seed" 같은 단어를 저장해 둘 수 있음
     name = Column(String(50), nullable=False, default="health_check")
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # DB 시각 (INSERT 문에 now() 를 직접 넣으므로 DEFAULT 가 없는 기존 테이블도 채워짐)
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now()
+    )
 
     def __repr__(self) -> str:
         return f"<DbHealthCheck id={self.id} name={self.name!r} created_at={self.created_at}>"
@@ -1,7 +1,5 @@
 # backend/models/scale_models.py
 
-from datetime import datetime
-
 from sqlalchemy import (
     Column,
     Integer,
@@ -10,6 +8,7 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     DateTime,
+    func,
 )
 from sqlalchemy.orm import relationship
 
@@ -30,20 +29,29 @@ class Scenario(Base):
 
     is_active = Column(Boolean, nullable=False, default=True)
 
+    # INSERT / UPDATE 모두 DB 시각 하나만 사용 (timestamptz → DB 서버 timezone 과 무관)
+    # - default=func.now(): ORM/Core INSERT 에 now() 를 직접 넣는다
+    #   (DEFAULT 가 없는 기존 배포 테이블에도 NOT NULL 이 채워지고, 파이썬 호출/바인드 파라미터 없음)
+    # - server_default: 새 테이블 DDL 의 DEFAULT now() (raw SQL INSERT 용)
+    # 기존 배포 테이블의 timestamp 컬럼은 main.init_db 가 기동 시 timestamptz 로 변환한다.
     created_at = Column(
-        DateTime,
+        DateTime(timezone=True),
         nullable=False,
-        default=datetime.utcnow,
+        default=func.now(),
+        server_default=func.now(),
     )
     updated_at = Column(
-        DateTime,
+        DateTime(timezone=True),
         nullable=False,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
     )
 
     # 관계
-    scales = relationship("Scale", back_populates="scenario")
+    # 컬렉션은 selectin 으로: Scenario 여러 개를 읽고 .scales[...].items 를 돌아도
+    # 부모마다 SELECT 하지 않고 컬렉션 단위로 IN (...) 쿼리 한 번씩만 나감
+    scales = relationship("Scale", back_populates="scenario", lazy="selectin")
 
 
 class Scale(Base):
@@ -70,20 +78,22 @@ class Scale(Base):
     is_active = Column(Boolean, nullable=False, default=True)
 
     created_at = Column(
-        DateTime,
+        DateTime(timezone=True),
         nullable=False,
-        default=datetime.utcnow,
+        default=func.now(),
+        server_default=func.now(),
     )
     updated_at = Column(
-        DateTime,
+        DateTime(timezone=True),
         nullable=False,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
     )
 
     # 관계
     scenario = relationship("Scenario", back_populates="scales")
-    items = relationship("ScaleItem", back_populates="scale")
+    items = relationship("ScaleItem", back_populates="scale", lazy="selectin")
 
 
 class ScaleItem(Base):
@@ -112,15 +122,17 @@ class ScaleItem(Base):
     is_active = Column(Boolean, nullable=False, default=True)
 
     created_at = Column(
-        DateTime,
+        DateTime(timezone=True),
         nullable=False,
-        default=datetime.utcnow,
+        default=func.now(),
+        server_default=func.now(),
     )
     updated_at = Column(
-        DateTime,
+        DateTime(timezone=True),
         nullable=False,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now(),
     )
 
     # 관계